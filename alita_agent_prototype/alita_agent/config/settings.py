@@ -47,15 +47,69 @@ class AlitaConfig:
 
     def __post_init__(self):
         """Set default nested configurations after initialization."""
+        # Episodes kept in RAM (hot), in SQLite (warm); older ones are
+        # archived in compressed segments of at least archive_batch (cold).
+        self.memory.setdefault("hot_episodes", 100)
         self.memory.setdefault("max_episodes", 1000)
+        self.memory.setdefault("archive_batch", 500)
+        # Results at least this large (serialized) are stored once per
+        # distinct content and shared by the episodes that produced them.
+        self.memory.setdefault("result_blob_min_bytes", 256)
+        # Answer repeated queries from memory: a result stored less than
+        # reuse_max_age seconds ago for a query this similar is returned
+        # without running the tool again.
+        self.memory.setdefault("reuse_results", False)
+        self.memory.setdefault("reuse_max_age", 300)
+        self.memory.setdefault("reuse_min_similarity", 1.0)
+        # Episodes are written in the background in batches of this size, or
+        # after this many seconds, whichever comes first.
+        self.memory.setdefault("flush_batch_size", 32)
+        self.memory.setdefault("flush_interval", 1.0)
         self.planning.setdefault("max_react_steps", 10)
 
         self.mcp.setdefault("execution_timeout", 60)
+        # "files" (<name>.py + <name>.meta.json) or "sqlite" (tools.sqlite3).
+        self.mcp.setdefault("tool_store", "files")
+        # Seconds between polls for tools saved by other processes.
+        self.mcp.setdefault("registry_refresh_interval", 5.0)
+        # Hashed n-gram embeddings of tool descriptions (requires numpy),
+        # consulted when no description is textually close to the query.
+        self.mcp.setdefault("vector_index", True)
+        self.mcp.setdefault("vector_dim", 256)
+        self.mcp.setdefault("semantic_match_threshold", 0.75)
+        # MinHash Jaccard estimate above which a new tool is a near duplicate.
+        self.mcp.setdefault("dedup_threshold", 0.8)
+        # Cached find_tool_by_description results, dropped when tools change.
+        self.mcp.setdefault("lookup_cache_size", 1024)
+        # Tool code candidates generated concurrently by create_tool.
+        self.mcp.setdefault("creation_candidates", 1)
+        # Threads running tools marked "trust": "trusted" in-process.
+        self.mcp.setdefault("trusted_max_workers", 4)
+        self.mcp.setdefault("max_concurrent_executions", 4)
+        self.mcp.setdefault("worker_pool_size", 2)
+        self.mcp.setdefault("worker_max_calls", 100)
+        self.mcp.setdefault("worker_preload", ["json", "math", "random"])
+        self.mcp.setdefault("script_cache_size", 256)
+        self.mcp.setdefault("script_cache_max_age", 7 * 24 * 3600)
+        # Results of tools marked deterministic in their metadata are cached.
+        self.mcp.setdefault("result_cache_size", 1024)
+        self.mcp.setdefault("result_cache_ttl", 3600)
+        self.mcp.setdefault("result_cache_persist", False)
         self.security.setdefault("sandbox_enabled", True)
         self.security.setdefault(
             "allowed_imports", ["json", "aiohttp", "math", "random", "sys"]
         )
         self.security.setdefault("use_docker", True)
+        # Disable to force every tool through the sandbox regardless of trust.
+        self.security.setdefault("allow_trusted_tools", True)
+        self.security.setdefault("validation_cache_size", 1024)
+        self.security.setdefault("docker_image", "python:3.10-slim")
+        self.security.setdefault("docker_pool_size", 2)
+        self.security.setdefault("docker_max_runs", 50)
+        # Limits of each warm container, shared by the tools it runs.
+        self.security.setdefault("docker_memory", "512m")
+        self.security.setdefault("docker_pids_limit", 64)
+        self.security.setdefault("docker_probe_ttl", 300)
         self._ensure_credentials()
 
     def get_workspace_path(self, sub_dir: str) -> Path:
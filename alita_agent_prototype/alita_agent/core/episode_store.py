@@ -0,0 +1,431 @@
+"""Episode Store: on-disk tiers of the episodic memory."""
+
+from __future__ import annotations
+
+import gzip
+import json
+import re
+import sqlite3
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from ..utils.helpers import atomic_write_bytes, content_hash
+from ..utils.logging import setup_logging
+from .tool_index import tokenize
+
+# (created at, episode) as queued by the memory system.
+TimedEpisode = Tuple[float, Dict[str, Any]]
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Warm episodes with their result, whether inline or in a blob.
+_SELECT_EPISODES = (
+    "SELECT e.id, e.created_at, e.normalized_query, e.data, b.data AS result"
+    " FROM episodes e LEFT JOIN blobs b ON b.hash = e.result_hash"
+)
+
+
+def normalize_query(query: Optional[str]) -> str:
+    """Lowercase words of ``query`` without punctuation or extra whitespace."""
+    return " ".join(_WORD_RE.findall((query or "").lower()))
+
+
+def word_similarity(words: Set[str], normalized: str) -> float:
+    """Jaccard similarity of ``words`` and the words of a normalized query."""
+    other = set(tokenize(normalized))
+    union = words | other
+    return len(words & other) / len(union) if union else 0.0
+
+
+def _decode(row: sqlite3.Row) -> Dict[str, Any]:
+    episode = json.loads(row["data"])
+    if row["result"] is not None:
+        episode["result"] = json.loads(row["result"])
+    return episode
+
+
+class EpisodeArchive:
+    """Cold tier: gzip-compressed JSON Lines segments that are never rewritten.
+
+    Each segment holds a contiguous range of episode ids and is named after
+    it (``episodes-<first>-<last>.jsonl.gz``), so the archive can be counted
+    and searched newest-first without opening every file. The directory is
+    listed once, on first use, and the listing kept up to date by ``write``.
+    """
+
+    _SEGMENT_RE = re.compile(r"episodes-(\d+)-(\d+)\.jsonl\.gz$")
+
+    def __init__(self, archive_dir: Path):
+        self.archive_dir = Path(archive_dir)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self._segments: Optional[List[Tuple[int, int, Path]]] = None
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        """Store ``rows`` (``id``, ``created``, ``episode``) as one segment."""
+        if not rows:
+            return
+        first, last = rows[0]["id"], rows[-1]["id"]
+        path = self.archive_dir / f"episodes-{first:012d}-{last:012d}.jsonl.gz"
+        data = "".join(json.dumps(row) + "\n" for row in rows).encode("utf-8")
+        atomic_write_bytes(path, gzip.compress(data))
+        self.segments().append((first, last, path))
+
+    def segments(self) -> List[Tuple[int, int, Path]]:
+        """``(first id, last id, path)`` of every segment, oldest first."""
+        if self._segments is None:
+            found = []
+            for path in self.archive_dir.iterdir():
+                match = self._SEGMENT_RE.match(path.name)
+                if match:
+                    found.append((int(match[1]), int(match[2]), path))
+            self._segments = sorted(found)
+        return self._segments
+
+    def last_id(self) -> int:
+        segments = self.segments()
+        return segments[-1][1] if segments else 0
+
+    def count(self) -> int:
+        return sum(last - first + 1 for first, last, _ in self.segments())
+
+    def tail(self, limit: int, before_id: int) -> List[Dict[str, Any]]:
+        """The newest ``limit`` archived rows with an id below ``before_id``."""
+        rows: List[Dict[str, Any]] = []
+        for first, _, path in reversed(self.segments()):
+            if len(rows) >= limit:
+                break
+            if first >= before_id:
+                continue
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                segment = [json.loads(line) for line in f]
+            segment = [row for row in segment if row["id"] < before_id]
+            rows[:0] = segment[-(limit - len(rows)) :]
+            before_id = first
+        return rows
+
+
+class EpisodeStore:
+    """Warm and cold tiers behind the in-memory hot ring of recent episodes.
+
+    The warm tier is a SQLite table (WAL mode, indexed by id) holding the
+    newest ``warm_limit`` episodes. Once it has ``archive_batch`` more than
+    that, the oldest overflow is demoted to an :class:`EpisodeArchive`
+    segment in one step. The ``episodic.json`` list kept by earlier versions
+    (``legacy_file``) is imported when the database is first created.
+
+    Warm episodes are indexed by normalized query, tool and time for
+    :meth:`find_similar`.
+
+    Results of at least ``blob_min_bytes`` serialized are kept once per
+    distinct content in a ``blobs`` table keyed by their SHA-256, which
+    episodes reference by hash. Each blob counts the warm episodes using it
+    and is deleted with the last of them; archived episodes carry their
+    result inline so segments stay self-contained.
+
+    Opening a store reads nothing but the schema version and a ``counters``
+    table of tier sizes, which is updated in the same transactions as the
+    rows it counts, so :meth:`counts` never scans.
+    """
+
+    SCHEMA_VERSION = 1
+
+    def __init__(
+        self,
+        db_path: Path,
+        archive_dir: Path,
+        warm_limit: int = 1000,
+        archive_batch: int = 500,
+        legacy_file: Optional[Path] = None,
+        blob_min_bytes: int = 256,
+    ):
+        self.logger = setup_logging("EpisodeStore")
+        self.db_path = Path(db_path)
+        self.warm_limit = warm_limit
+        self.archive_batch = archive_batch
+        self.blob_min_bytes = blob_min_bytes
+        self.archive = EpisodeArchive(archive_dir)
+        self._conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        # Counter changes of the open transaction, applied when it commits.
+        self._uncounted: Counter = Counter()
+        self._counts: Counter = Counter()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate(legacy_file)
+        self._counts = Counter(
+            dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+        )
+
+    def append(self, episodes: List[TimedEpisode]) -> None:
+        """Insert ``episodes`` in one transaction, then demote any overflow."""
+        if not episodes:
+            return
+        with self._lock:
+            with self._transaction():
+                self._insert(episodes)
+            self._archive_overflow()
+
+    def tail(self, limit: int) -> List[Dict[str, Any]]:
+        """The newest ``limit`` episodes across tiers, oldest first."""
+        if limit <= 0:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"{_SELECT_EPISODES} ORDER BY e.id DESC LIMIT ?", (limit,)
+            ).fetchall()
+            oldest_warm = rows[-1]["id"] if rows else sys.maxsize
+        episodes = [_decode(row) for row in reversed(rows)]
+        if len(episodes) < limit:
+            cold = self.archive.tail(limit - len(episodes), oldest_warm)
+            episodes[:0] = [row["episode"] for row in cold]
+        return episodes
+
+    def find_similar(
+        self,
+        query: str,
+        limit: int = 5,
+        tool: Optional[str] = None,
+        since: Optional[float] = None,
+        min_similarity: float = 1.0,
+        scan: int = 200,
+    ) -> List[Dict[str, Any]]:
+        """Warm episodes whose query matches ``query``, best and newest first.
+
+        Episodes with the same normalized query are found through the index
+        and score 1.0. Below that, ``similarity`` is the Jaccard similarity of
+        the queries' words, checked against the newest ``scan`` episodes.
+        Results are dicts with ``episode``, ``similarity`` and ``created_at``.
+        """
+        normalized = normalize_query(query)
+        filters, params = "", []
+        if tool is not None:
+            filters += " AND e.tool = ?"
+            params.append(tool)
+        if since is not None:
+            filters += " AND e.created_at >= ?"
+            params.append(since)
+        with self._lock:
+            rows = self._conn.execute(
+                f"{_SELECT_EPISODES} WHERE e.normalized_query = ?{filters}"
+                " ORDER BY e.id DESC LIMIT ?",
+                (normalized, *params, limit),
+            ).fetchall()
+            recent = []
+            if min_similarity < 1.0 and len(rows) < limit:
+                recent = self._conn.execute(
+                    f"{_SELECT_EPISODES} WHERE e.normalized_query != ?{filters}"
+                    " ORDER BY e.id DESC LIMIT ?",
+                    (normalized, *params, scan),
+                ).fetchall()
+        matches = [(1.0, row) for row in rows]
+        words = set(tokenize(normalized))
+        for row in recent:
+            similarity = word_similarity(words, row["normalized_query"])
+            if similarity >= min_similarity:
+                matches.append((similarity, row))
+        matches.sort(key=lambda match: (match[0], match[1]["id"]), reverse=True)
+        return [
+            {
+                "episode": _decode(row),
+                "similarity": similarity,
+                "created_at": row["created_at"],
+            }
+            for similarity, row in matches[:limit]
+        ]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {name: self._counts[name] for name in ("warm", "cold", "blobs")}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            self._uncounted.clear()
+            raise
+        self._conn.execute("COMMIT")
+        self._counts.update(self._uncounted)
+        self._uncounted.clear()
+
+    def _count(self, **deltas: int) -> None:
+        """Adjust the tier counters within the open transaction."""
+        self._conn.executemany(
+            "UPDATE counters SET value = value + ? WHERE name = ?",
+            [(delta, name) for name, delta in deltas.items()],
+        )
+        self._uncounted.update(deltas)
+
+    def _insert(self, episodes: List[TimedEpisode]) -> None:
+        """Insert ``episodes``, skipping any that can't be serialized.
+
+        Values JSON can't represent, such as sets returned by trusted tools,
+        are stored as their ``str()``.
+        """
+        rows = []
+        blobs: Dict[str, List[Any]] = {}
+        for created, episode in episodes:
+            result = result_hash = None
+            try:
+                if "result" in episode:
+                    result = json.dumps(episode["result"], default=str)
+                    if len(result) >= self.blob_min_bytes:
+                        result_hash = content_hash(result)
+                        episode = {k: v for k, v in episode.items() if k != "result"}
+                data = json.dumps(episode, default=str)
+            except (ValueError, RecursionError) as e:
+                self.logger.error(f"Skipping episode for {episode.get('query')!r}: {e}")
+                continue
+            if result_hash is not None:
+                blobs.setdefault(result_hash, [result, 0])[1] += 1
+            rows.append(
+                (
+                    created,
+                    episode.get("query"),
+                    normalize_query(episode.get("query")),
+                    episode.get("tool"),
+                    data,
+                    result_hash,
+                )
+            )
+        added = self._conn.executemany(
+            "INSERT OR IGNORE INTO blobs (hash, data, refs) VALUES (?, ?, 0)",
+            [(key, data) for key, (data, _) in blobs.items()],
+        ).rowcount
+        self._conn.executemany(
+            "UPDATE blobs SET refs = refs + ? WHERE hash = ?",
+            [(refs, key) for key, (_, refs) in blobs.items()],
+        )
+        self._conn.executemany(
+            "INSERT INTO episodes"
+            " (created_at, query, normalized_query, tool, data, result_hash)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        self._count(warm=len(rows), blobs=max(added, 0))
+
+    def _evict(self, last_id: int) -> None:
+        """Delete warm episodes up to ``last_id`` and blobs only they used."""
+        with self._transaction():
+            released = self._conn.execute(
+                "SELECT result_hash, COUNT(*) FROM episodes"
+                " WHERE id <= ? AND result_hash IS NOT NULL GROUP BY result_hash",
+                (last_id,),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE blobs SET refs = refs - ? WHERE hash = ?",
+                [(count, key) for key, count in released],
+            )
+            deleted = self._conn.executemany(
+                "DELETE FROM blobs WHERE hash = ? AND refs <= 0",
+                [(key,) for key, _ in released],
+            ).rowcount
+            archived = self._conn.execute(
+                "DELETE FROM episodes WHERE id <= ?", (last_id,)
+            ).rowcount
+            self._count(warm=-archived, cold=archived, blobs=-max(deleted, 0))
+
+    def _archive_overflow(self) -> None:
+        # Rows archived by a run that crashed before deleting them.
+        archived = self.archive.last_id()
+        oldest = self._conn.execute("SELECT MIN(id) FROM episodes").fetchone()[0]
+        if oldest is not None and oldest <= archived:
+            self._evict(archived)
+        warm = self._counts["warm"]
+        if warm < self.warm_limit + self.archive_batch:
+            return
+        rows = self._conn.execute(
+            f"{_SELECT_EPISODES} ORDER BY e.id LIMIT ?",
+            (warm - self.warm_limit,),
+        ).fetchall()
+        self.archive.write(
+            [
+                {"id": row["id"], "created": row["created_at"], "episode": _decode(row)}
+                for row in rows
+            ]
+        )
+        self._evict(rows[-1]["id"])
+        self.logger.debug(f"Archived {len(rows)} episodes")
+
+    def _migrate(self, legacy_file: Optional[Path]) -> None:
+        with self._lock, self._transaction():
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= self.SCHEMA_VERSION:
+                return
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS episodes ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " created_at REAL NOT NULL,"
+                " query TEXT,"
+                " normalized_query TEXT,"
+                " tool TEXT,"
+                " data TEXT NOT NULL,"
+                " result_hash TEXT)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS episodes_query"
+                " ON episodes (normalized_query, created_at)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS episodes_tool"
+                " ON episodes (tool, created_at)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " hash TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " refs INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            # Kept current by _count from here on.
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters ("
+                " name TEXT PRIMARY KEY,"
+                " value INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            self._conn.executemany(
+                "INSERT INTO counters (name, value) VALUES (?, ?)",
+                [("warm", 0), ("cold", self.archive.count()), ("blobs", 0)],
+            )
+            imported = legacy_file is not None and self._import_legacy(legacy_file)
+            self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        # Only once the import is committed; a file that couldn't be read is
+        # left for the user to recover.
+        if imported:
+            legacy_file.unlink(missing_ok=True)
+
+    def _import_legacy(self, path: Path) -> bool:
+        """Import the JSON list of episodes the memory system used to keep.
+
+        Returns whether the file was imported.
+        """
+        if not path.exists():
+            return False
+        try:
+            loaded = json.loads(path.read_text())
+        except ValueError as e:
+            self.logger.warning(f"Could not import {path}, left in place: {e}")
+            return False
+        if not isinstance(loaded, list):
+            self.logger.warning(f"Could not import {path}, left in place")
+            return False
+        # The file doesn't record when each episode happened.
+        created = path.stat().st_mtime
+        self._insert([(created, episode) for episode in loaded])
+        self.logger.info(f"Imported {len(loaded)} episodes into {self.db_path}")
+        return True
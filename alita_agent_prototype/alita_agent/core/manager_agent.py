@@ -1,6 +1,6 @@
 """The Manager Agent: Central orchestrator for the Alita Framework."""
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from ..config.settings import AlitaConfig
 from ..utils.logging import setup_logging
 from .web_agent import WebAgent
@@ -8,6 +8,8 @@ from .mcp_system import MCPSystem
 from .memory import HierarchicalMemorySystem
 from .planning import HybridPlanner
 from .tool_registry import ToolRegistry
+from .tool_store import open_tool_store
+from .tool_vectors import VectorIndex, vectors_available
 from ..exceptions import ToolCreationError, ToolExecutionError
 from ..utils.llm_client import LLMClient
 
@@ -19,10 +21,26 @@ class ManagerAgent:
         self.config = config
         self.logger = setup_logging("ManagerAgent")
         self.web_agent = WebAgent(config)
+        self.tool_store = open_tool_store(config)
+        tools_dir = self.config.get_workspace_path("tools")
+        vectors = None
+        if self.config.mcp.get("vector_index", True) and vectors_available():
+            vectors = VectorIndex(
+                dim=self.config.mcp.get("vector_dim", 256),
+                path=tools_dir / "tool_vectors.npy",
+            )
         self.tool_registry = ToolRegistry(
-            self.config.get_workspace_path("tools")
+            tools_dir,
+            store=self.tool_store,
+            refresh_interval=self.config.mcp.get("registry_refresh_interval", 5.0),
+            vectors=vectors,
+            semantic_threshold=self.config.mcp.get("semantic_match_threshold", 0.75),
+            dedup_threshold=self.config.mcp.get("dedup_threshold", 0.8),
+            lookup_cache_size=self.config.mcp.get("lookup_cache_size", 1024),
         )
-        self.mcp_system = MCPSystem(config, self.web_agent, self.tool_registry)
+        self.mcp_system = MCPSystem(
+            config, self.web_agent, self.tool_registry, tool_store=self.tool_store
+        )
         self.memory = HierarchicalMemorySystem(config)
         self.planner = HybridPlanner(config)
         self.llm = LLMClient(config)
@@ -31,9 +49,15 @@ class ManagerAgent:
     async def process_task(self, user_query: str) -> Dict[str, Any]:
         self.logger.info(f"Received task: '{user_query}'")
         try:
+            reused = await self._reuse_recent_result(user_query)
+            if reused is not None:
+                return reused
             await self.planner.plan(user_query, [])
             # 1. Determine the name and description of the required tool
-            existing = self.tool_registry.find_tool_by_description(user_query)
+            # Near duplicates are reused rather than created again.
+            existing = self.tool_registry.find_tool_by_description(
+                user_query
+            ) or self.tool_registry.find_duplicate(user_query)
             if existing:
                 tool_name = existing
                 tool_description = self.tool_registry.tools[existing]
@@ -82,6 +106,28 @@ class ManagerAgent:
             )
             return {"success": False, "error": f"An unexpected error occurred: {e}"}
 
+    async def aclose(self) -> None:
+        """Shut down background resources held by the agent's subsystems."""
+        self.mcp_system.close()
+        self.tool_registry.close()
+        await self.memory.aclose()
+
+    async def _reuse_recent_result(self, user_query: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh stored result for the same query, if reuse is enabled."""
+        if not self.config.memory.get("reuse_results", False):
+            return None
+        matches = await self.memory.find_similar_episodes(
+            user_query,
+            limit=1,
+            max_age=self.config.memory.get("reuse_max_age", 300),
+            min_similarity=self.config.memory.get("reuse_min_similarity", 1.0),
+        )
+        if not matches:
+            return None
+        episode = matches[0]["episode"]
+        self.logger.info(f"Reusing a stored result of tool '{episode.get('tool')}'")
+        return {"success": True, "result": episode.get("result"), "reused": True}
+
     def _generate_tool_name_from_query(self, query: str) -> str:
         """Generates a simple, deterministic tool name from a query."""
         import re
@@ -1,14 +1,24 @@
 """The MCP System: Handles dynamic tool creation, validation, and execution."""
 
+import asyncio
 import json
-from typing import Dict, Any
+from contextlib import aclosing
+from pathlib import Path
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 from ..config.settings import AlitaConfig
 from ..utils.logging import setup_logging
 from ..exceptions import ToolCreationError
 from .web_agent import WebAgent
-from ..utils.security import SandboxExecutor
+from ..utils.bytecode import compile_tool, is_fresh
+from ..utils.file_lock import FileLock
+from ..utils.inprocess import TRUST_LEVELS, TRUST_TRUSTED, InProcessExecutor
+from ..utils.result_cache import MISS, ResultCache
+from ..utils.security import SandboxExecutor, ToolExecutionResult
+from ..utils.tool_stats import ResourceUsage, ToolStatsStore
+from ..utils.tool_stream import ToolStreamRecord
 from ..utils.llm_client import LLMClient
 from .tool_registry import ToolRegistry
+from .tool_store import ToolStore, open_tool_store
 
 
 class MCPSystem:
@@ -19,18 +29,84 @@ class MCPSystem:
         config: AlitaConfig,
         web_agent: WebAgent,
         tool_registry: ToolRegistry | None = None,
+        tool_store: ToolStore | None = None,
     ):
         self.config = config
         self.logger = setup_logging("MCPSystem")
         self.web_agent = web_agent
         self.tools_dir = self.config.get_workspace_path("tools")
+        self.locks_dir = self.config.get_workspace_path("tools/locks")
         self.sandbox = SandboxExecutor(config)
+        # Fast path for tools whose metadata marks them as trusted.
+        self.in_process = InProcessExecutor(
+            max_workers=self.config.mcp.get("trusted_max_workers", 4),
+            timeout=self.config.mcp["execution_timeout"],
+        )
         self.llm = LLMClient(config)
         self.tool_registry = tool_registry
+        self.tool_store = tool_store or open_tool_store(config)
+        self.tool_stats = ToolStatsStore()
+        self.result_cache: Optional[ResultCache] = None
+        if self.config.mcp.get("result_cache_size", 0) > 0:
+            persist = self.config.mcp.get("result_cache_persist", False)
+            self.result_cache = ResultCache(
+                max_entries=self.config.mcp["result_cache_size"],
+                ttl=self.config.mcp.get("result_cache_ttl"),
+                persist_dir=(
+                    self.config.get_workspace_path("result_cache") if persist else None
+                ),
+            )
+        # tool name -> in-flight creation shared by concurrent callers
+        self._creations: Dict[str, asyncio.Task] = {}
         # Default to using the real LLM for code generation
         self.llm_code_generator = self._generate_tool_code
 
-    async def create_tool(self, name: str, task_description: str) -> None:
+    async def create_tool(
+        self, name: str, task_description: str, deterministic: bool = False
+    ) -> None:
+        """Generate, validate and save a tool.
+
+        ``deterministic`` marks the tool as a pure function of its parameters,
+        which lets its results be served from the result cache.
+
+        Concurrent calls for the same name share a single creation, and a lock
+        file in ``locks_dir`` serializes creation across processes. Once
+        the lock is held, a tool that is already saved (e.g. by another
+        process) is reused instead of being generated again.
+        """
+        loop = asyncio.get_running_loop()
+        creation = self._creations.get(name)
+        if creation is None or creation.get_loop() is not loop:
+            creation = loop.create_task(
+                self._create_tool_once(name, task_description, deterministic)
+            )
+            self._creations[name] = creation
+
+            def forget(task: asyncio.Task) -> None:
+                if self._creations.get(name) is task:
+                    del self._creations[name]
+
+            creation.add_done_callback(forget)
+        # Shielded so one caller's cancellation doesn't fail the others.
+        await asyncio.shield(creation)
+
+    async def _create_tool_once(
+        self, name: str, task_description: str, deterministic: bool
+    ) -> None:
+        async with FileLock(self.locks_dir / f"{name}.lock"):
+            metadata = self.tool_store.get_metadata(name)
+            if metadata:
+                self.logger.info(f"Tool '{name}' was created concurrently; reusing it.")
+                if self.tool_registry and not self.tool_registry.tool_exists(name):
+                    self.tool_registry.register_tool(
+                        name, metadata.get("description", task_description)
+                    )
+                return
+            await self._generate_and_save_tool(name, task_description, deterministic)
+
+    async def _generate_and_save_tool(
+        self, name: str, task_description: str, deterministic: bool
+    ) -> None:
         self.logger.info(f"Initiating creation for tool: '{name}'")
 
         search_query = f"Simple Python script for '{task_description}'"
@@ -41,16 +117,65 @@ class MCPSystem:
         if search_results and search_results.results:
             context_str = json.dumps(search_results.results[0], indent=2)
 
+        candidates = self.config.mcp.get("creation_candidates", 1)
+        if candidates > 1:
+            code = await self._first_passing_candidate(
+                name, task_description, context_str, candidates
+            )
+            self._save_tool_to_disk(name, code, task_description, deterministic)
+            self.logger.info(f"Tool '{name}' created and saved successfully.")
+            return
+
         code = await self.llm_code_generator(name, task_description, context_str)
 
         if await self.sandbox.validate_code(code):
-            self._save_tool_to_disk(name, code, task_description)
+            self._save_tool_to_disk(name, code, task_description, deterministic)
             self.logger.info(f"Tool '{name}' created and saved successfully.")
         else:
             raise ToolCreationError(
                 f"Generated code for '{name}' failed syntax validation."
             )
 
+    async def _first_passing_candidate(
+        self, name: str, task_description: str, context: str, count: int
+    ) -> str:
+        """Generate ``count`` candidates concurrently and return the first to pass.
+
+        Each candidate is validated and then smoke-tested in the sandbox with
+        the parameters the manager agent calls tools with. As soon as one
+        passes, the remaining generations and smoke tests are cancelled.
+        """
+
+        async def attempt(index: int) -> str:
+            code = await self.llm_code_generator(name, task_description, context)
+            if not await self.sandbox.validate_code(code):
+                raise ToolCreationError(f"candidate {index} failed syntax validation")
+            result = await self.sandbox.execute_code(
+                code, {"task_query": task_description}
+            )
+            if not result.success:
+                raise ToolCreationError(
+                    f"candidate {index} failed its smoke test: {result.error}"
+                )
+            return code
+
+        tasks = [asyncio.create_task(attempt(index)) for index in range(count)]
+        errors = []
+        try:
+            for finished in asyncio.as_completed(tasks):
+                try:
+                    return await finished
+                except Exception as e:
+                    self.logger.warning(f"Tool '{name}': {e}")
+                    errors.append(str(e))
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        raise ToolCreationError(
+            f"None of the {count} candidates for '{name}' passed: " + "; ".join(errors)
+        )
+
     async def _generate_tool_code(
         self, name: str, description: str, context: str
     ) -> str:
@@ -64,22 +189,159 @@ class MCPSystem:
         return await self.llm.generate(prompt)
 
     async def execute_tool(self, tool_name: str, parameters: Dict[str, Any]):
-        tool_path = self.tools_dir / f"{tool_name}.py"
-        if not tool_path.exists():
-            raise ToolCreationError(f"Tool '{tool_name}' not found at {tool_path}")
-
-        code = tool_path.read_text()
-        return await self.sandbox.execute_code(code, parameters)
-
-    def _save_tool_to_disk(self, name: str, code: str, description: str):
-        (self.tools_dir / f"{name}.py").write_text(code)
-        metadata = {"name": name, "description": description}
-        meta_path = self.tools_dir / f"{name}.meta.json"
-        meta_path.write_text(json.dumps(metadata, indent=2))
+        code, bytecode, metadata = self._load_tool(tool_name)
+        cache_key = self._result_cache_key(metadata, code, parameters)
+        if cache_key:
+            cached = self._cached_result(tool_name, cache_key)
+            if cached is not None:
+                return cached
+        if self._is_trusted(metadata):
+            result = await self.in_process.execute(code, parameters)
+        else:
+            result = await self.sandbox.execute_code(code, parameters, bytecode)
+        self._record_execution(tool_name, result.usage, result.success)
+        if cache_key and result.success:
+            self.result_cache.put(cache_key, result.result)
+        return result
+
+    async def execute_tool_batch(
+        self, tool_name: str, params_list: List[Dict[str, Any]]
+    ) -> List[ToolExecutionResult]:
+        """Run a tool over many inputs in one sandbox process, in input order."""
+        code, bytecode, metadata = self._load_tool(tool_name)
+        results: List[Optional[ToolExecutionResult]] = [None] * len(params_list)
+        cache_keys = [
+            self._result_cache_key(metadata, code, params) for params in params_list
+        ]
+        for index, cache_key in enumerate(cache_keys):
+            if cache_key:
+                results[index] = self._cached_result(tool_name, cache_key)
+        pending = [index for index, result in enumerate(results) if result is None]
+        if self._is_trusted(metadata):
+            executed = await asyncio.gather(
+                *(self.in_process.execute(code, params_list[i]) for i in pending)
+            )
+        else:
+            executed = await self.sandbox.execute_code_batch(
+                code, [params_list[index] for index in pending], bytecode
+            )
+        for index, result in zip(pending, executed):
+            self._record_execution(tool_name, result.usage, result.success)
+            if cache_keys[index] and result.success:
+                self.result_cache.put(cache_keys[index], result.result)
+            results[index] = result
+        return results
+
+    async def execute_tool_stream(
+        self, tool_name: str, parameters: Dict[str, Any]
+    ) -> AsyncIterator[ToolStreamRecord]:
+        """Execute a tool and yield its progress, partial and final records.
+
+        Streaming always runs in the sandbox, even for trusted tools.
+        """
+        code, bytecode, metadata = self._load_tool(tool_name)
+        cache_key = self._result_cache_key(metadata, code, parameters)
+        if cache_key:
+            cached = self._cached_result(tool_name, cache_key)
+            if cached is not None:
+                yield ToolStreamRecord(type="result", data=cached.result)
+                return
+        streamed_partials = False
+        stream = self.sandbox.execute_code_stream(code, parameters, bytecode)
+        async with aclosing(stream) as records:
+            async for record in records:
+                streamed_partials |= record.type == "partial"
+                if record.terminal:
+                    self._record_execution(
+                        tool_name, record.usage, record.type == "result"
+                    )
+                    # A streamed result is only complete with its partials.
+                    if cache_key and record.type == "result" and not streamed_partials:
+                        self.result_cache.put(cache_key, record.data)
+                yield record
+
+    def _result_cache_key(
+        self, metadata: Dict[str, Any], code: str, parameters: Dict[str, Any]
+    ) -> Optional[str]:
+        """Return the result cache key of a call to a deterministic tool."""
+        if not self.result_cache or not metadata.get("deterministic", False):
+            return None
+        return ResultCache.make_key(code, parameters)
+
+    def _is_trusted(self, metadata: Dict[str, Any]) -> bool:
+        return metadata.get("trust") == TRUST_TRUSTED and self.config.security.get(
+            "allow_trusted_tools", True
+        )
+
+    def set_tool_trust(self, tool_name: str, trust: str) -> None:
+        """Set a tool's trust level.
+
+        ``"trusted"`` tools run in-process, without the sandbox; only mark
+        tools whose code has been audited. ``"sandboxed"`` is the default.
+        """
+        if trust not in TRUST_LEVELS:
+            raise ValueError(f"Unknown trust level: {trust!r}")
+        tool = self.tool_store.get_tool(tool_name)
+        if tool is None:
+            raise ToolCreationError(f"Tool '{tool_name}' not found.")
+        self.tool_store.save(tool_name, tool.code, {**tool.metadata, "trust": trust})
+
+    def _cached_result(
+        self, tool_name: str, cache_key: str
+    ) -> Optional[ToolExecutionResult]:
+        cached = self.result_cache.get(cache_key)
+        if cached is MISS:
+            return None
+        self.tool_stats.record_cache_hit(tool_name)
+        return ToolExecutionResult(success=True, result=cached, cached=True)
+
+    def _record_execution(
+        self, tool_name: str, usage: Optional[ResourceUsage], success: bool
+    ) -> None:
+        self.tool_stats.record(tool_name, usage, success)
+        self.tool_store.record_execution(tool_name, usage, success)
+
+    def _load_tool(self, tool_name: str) -> Tuple[str, Optional[Path], Dict[str, Any]]:
+        """Return a tool's source, up-to-date bytecode path and metadata."""
+        code = self.tool_store.get_code(tool_name)
+        if code is None:
+            raise ToolCreationError(f"Tool '{tool_name}' not found.")
+        bytecode = self._ensure_bytecode(tool_name, code.encode("utf-8"))
+        return code, bytecode, self.tool_store.get_metadata(tool_name)
+
+    def _ensure_bytecode(self, tool_name: str, source: bytes) -> Optional[Path]:
+        """(Re)compile ``<tool>.pyc`` in the tools directory when it is stale.
+
+        The file's header is checked on every call rather than remembered,
+        since anything with access to the tools directory can replace it.
+        """
+        pyc_path = self.tools_dir / f"{tool_name}.pyc"
+        if not is_fresh(pyc_path, source) and not compile_tool(
+            source, pyc_path, str(pyc_path.with_suffix(".py"))
+        ):
+            return None
+        return pyc_path
+
+    def _save_tool_to_disk(
+        self, name: str, code: str, description: str, deterministic: bool = False
+    ):
+        metadata = {
+            "name": name,
+            "description": description,
+            "deterministic": deterministic,
+        }
+        self.tool_store.save(name, code, metadata)
+        self._ensure_bytecode(name, code.encode("utf-8"))
         if self.tool_registry:
             self.tool_registry.register_tool(name, description)
 
+    def close(self) -> None:
+        """Release sandbox resources such as warm worker processes."""
+        self.sandbox.close()
+        self.in_process.close()
+        self.tool_store.close()
+
     async def tool_exists(self, tool_name: str) -> bool:
         if self.tool_registry and self.tool_registry.tool_exists(tool_name):
             return True
-        return (self.tools_dir / f"{tool_name}.meta.json").exists()
+        return self.tool_store.exists(tool_name)
@@ -1,52 +1,240 @@
 """
-Hierarchical Memory System (Placeholder)
-A simplified in-memory store for this prototype.
+Hierarchical Memory System
+Episodic memory of completed tasks, tiered from RAM to disk.
 """
 
-from typing import Dict, Any, List
+import asyncio
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Deque, Dict, Any, List, Optional
 from ..config.settings import AlitaConfig
 from ..utils.logging import setup_logging
+from .episode_store import (
+    EpisodeStore,
+    TimedEpisode,
+    normalize_query,
+    word_similarity,
+)
+from .tool_index import tokenize
 
 
 class HierarchicalMemorySystem:
-    """Simple persistent episodic memory stored on disk."""
+    """Episodic memory in three tiers, with RAM use independent of history.
+
+    - hot: the newest ``hot_episodes`` episodes in an in-memory ring buffer
+      (``episodic_memory``), serving recent reads without touching disk;
+    - warm: the newest ``max_episodes`` episodes in SQLite;
+    - cold: older episodes, demoted in batches to compressed archive segments.
+
+    ``get_recent_episodes`` reads through to the warm and cold tiers when
+    asked for more than the hot tier holds. Startup only opens the store and
+    loads the hot tier; older episodes are paged in by such reads, and
+    ``get_memory_stats`` uses counters the store keeps as it writes.
+
+    Persistence is write-behind: ``store_episode`` only updates memory and
+    queues the episode. A background task hands queued episodes to a single
+    writer thread once ``flush_batch_size`` are pending or ``flush_interval``
+    seconds have passed. ``flush`` waits for everything queued so far and
+    ``aclose`` must be awaited before shutdown so nothing is lost; the memory
+    system can't be used afterwards. Lookups never wait for queued writes:
+    ``find_similar_episodes`` searches episodes that aren't written yet in
+    memory and only queries the store for the rest.
+    """
 
     def __init__(self, config: AlitaConfig):
         self.config = config
         self.logger = setup_logging("HierarchicalMemorySystem")
+        self.max_episodes = self.config.memory.get("max_episodes", 100)
+        self.hot_episodes = self.config.memory.get("hot_episodes", 100)
         memory_dir = self.config.get_workspace_path("memory")
-        self.memory_file = memory_dir / "episodic.json"
-        self.episodic_memory: List[Dict[str, Any]] = self._load_memory()
+        self.store = EpisodeStore(
+            memory_dir / "episodes.sqlite3",
+            memory_dir / "archive",
+            warm_limit=self.max_episodes,
+            archive_batch=self.config.memory.get("archive_batch", 500),
+            # Written by earlier versions.
+            legacy_file=memory_dir / "episodic.json",
+            blob_min_bytes=self.config.memory.get("result_blob_min_bytes", 256),
+        )
+        self.episodic_memory: Deque[Dict[str, Any]] = deque(
+            self.store.tail(self.hot_episodes), maxlen=self.hot_episodes
+        )
+        self.flush_batch_size = self.config.memory.get("flush_batch_size", 32)
+        self.flush_interval = self.config.memory.get("flush_interval", 1.0)
+        self._pending: List[TimedEpisode] = []
+        # Batches handed to the writer, removed once they are in the store.
+        self._writing: Deque[List[TimedEpisode]] = deque()
+        # One thread, so batches reach the log in the order they were queued.
+        self._writer = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="alita-memory"
+        )
+        self._last_write: Optional[Future] = None
+        self._flusher: Optional[asyncio.Task] = None
         self.logger.info("Memory System initialized.")
 
     async def store_episode(self, experience: Dict[str, Any]):
         """Stores a task experience."""
         self.logger.info(f"Storing experience for task: {experience.get('query')}")
+        # The ring drops its oldest episode, which is already (or about to
+        # be) in the warm tier.
         self.episodic_memory.append(experience)
-        if len(self.episodic_memory) > self.config.memory.get("max_episodes", 100):
-            self.episodic_memory.pop(0)  # Keep memory from growing indefinitely
-        self._save_memory()
+        self._pending.append((time.time(), experience))
+        self._schedule_flush()
+
+    async def flush(self) -> None:
+        """Wait until every episode stored so far has been written."""
+        write = self._submit_pending()
+        if write is not None:
+            await asyncio.wrap_future(write)
+
+    async def aclose(self) -> None:
+        """Stop the background flusher and write any pending episodes."""
+        if self._flusher is not None and not self._flusher.done():
+            self._flusher.cancel()
+        self._flusher = None
+        await self.flush()
+        await self._on_writer(self.store.close)
+        self._writer.shutdown()
 
     async def get_memory_stats(self) -> Dict[str, int]:
-        return {"episodic_episodes": len(self.episodic_memory)}
+        counts = await self._on_writer(self.store.counts)
+        return {
+            "episodic_episodes": counts["warm"] + counts["cold"],
+            "hot_episodes": len(self.episodic_memory),
+            "warm_episodes": counts["warm"],
+            "cold_episodes": counts["cold"],
+            "result_blobs": counts["blobs"],
+        }
 
     async def get_recent_episodes(self, limit: int = 5) -> List[Dict[str, Any]]:
         """Return the most recent `limit` episodes in chronological order."""
         if limit <= 0:
             return []
-        return self.episodic_memory[-limit:]
+        hot = self.episodic_memory
+        # A ring that isn't full holds the entire history.
+        if limit <= len(hot) or len(hot) < self.hot_episodes:
+            return list(islice(reversed(hot), limit))[::-1]
+        return await self._on_writer(self.store.tail, limit)
+
+    async def find_similar_episodes(
+        self,
+        query: str,
+        limit: int = 5,
+        tool: Optional[str] = None,
+        max_age: Optional[float] = None,
+        min_similarity: float = 1.0,
+    ) -> List[Dict[str, Any]]:
+        """Return stored episodes matching ``query``, best and newest first.
+
+        Only episodes from the warm tier or not yet written, stored less than
+        ``max_age`` seconds ago (if given) and, optionally, by ``tool`` are
+        considered. Each result has the ``episode``, its ``similarity`` (1.0
+        for the same normalized query) and ``created_at``.
+        """
+        since = time.time() - max_age if max_age is not None else None
+        # Taken before querying the store, so a batch written in between
+        # shows up twice rather than not at all.
+        unwritten = self._find_unwritten(query, tool, since, min_similarity)
+        loop = asyncio.get_running_loop()
+        stored = await loop.run_in_executor(
+            None, self.store.find_similar, query, limit, tool, since, min_similarity
+        )
+
+        def identity(match: Dict[str, Any]):
+            return match["created_at"], match["episode"].get("query")
+
+        seen = {identity(match) for match in unwritten}
+        matches = unwritten + [m for m in stored if identity(m) not in seen]
+        # Stable, so equally similar episodes stay newest first.
+        matches.sort(key=lambda match: match["similarity"], reverse=True)
+        return matches[:limit]
+
+    def _find_unwritten(
+        self,
+        query: str,
+        tool: Optional[str],
+        since: Optional[float],
+        min_similarity: float,
+    ) -> List[Dict[str, Any]]:
+        """Match ``query`` against episodes not in the store yet, newest first."""
+        normalized = normalize_query(query)
+        words = set(tokenize(normalized))
+        batches = [*self._writing, self._pending]
+        matches = []
+        for created, episode in reversed([e for batch in batches for e in batch]):
+            if tool is not None and episode.get("tool") != tool:
+                continue
+            if since is not None and created < since:
+                continue
+            other = normalize_query(episode.get("query"))
+            if other == normalized:
+                similarity = 1.0
+            elif min_similarity < 1.0:
+                similarity = word_similarity(words, other)
+            else:
+                continue
+            if similarity >= min_similarity:
+                matches.append(
+                    {
+                        "episode": episode,
+                        "similarity": similarity,
+                        "created_at": created,
+                    }
+                )
+        return matches
+
+    async def _on_writer(self, function, *args):
+        """Run ``function`` on the writer thread after every pending write."""
+        await self.flush()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, function, *args)
+
+    def _schedule_flush(self) -> None:
+        if len(self._pending) >= self.flush_batch_size:
+            # Hand full batches over right away rather than waiting for the
+            # flusher to be scheduled, which bounds what is held in memory.
+            self._submit_pending()
+            return
+        loop = asyncio.get_running_loop()
+        # A flusher left behind by a previous event loop was cancelled with
+        # it and already handed its episodes to the writer.
+        if (
+            self._flusher is None
+            or self._flusher.done()
+            or self._flusher.get_loop() is not loop
+        ):
+            self._flusher = loop.create_task(self._flush_later())
 
-    def _load_memory(self) -> List[Dict[str, Any]]:
-        if self.memory_file.exists():
-            try:
-                import json
+    async def _flush_later(self) -> None:
+        try:
+            while self._pending:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        finally:
+            # Also reached when the loop shuts down and cancels this task.
+            self._submit_pending()
 
-                return json.loads(self.memory_file.read_text())
-            except Exception:
-                return []
-        return []
+    def _submit_pending(self) -> Optional[Future]:
+        """Queue pending episodes for the writer; return the latest write."""
+        if self._pending:
+            batch, self._pending = self._pending, []
+            self._writing.append(batch)
+            self._last_write = self._writer.submit(self._save_memory, batch)
+        return self._last_write
 
-    def _save_memory(self) -> None:
-        import json
+    def _save_memory(self, new_episodes: List[TimedEpisode]) -> None:
+        """Add ``new_episodes`` to the warm tier, demoting overflow to cold.
 
-        self.memory_file.write_text(json.dumps(self.episodic_memory, indent=2))
+        Runs on the writer thread; failures are logged since no caller waits
+        for the result.
+        """
+        try:
+            self.store.append(new_episodes)
+        except (OSError, sqlite3.Error, TypeError, ValueError) as e:
+            self.logger.error(f"Failed to persist {len(new_episodes)} episodes: {e}")
+        finally:
+            # Batches are written in the order they were queued.
+            self._writing.popleft()
@@ -0,0 +1,115 @@
+"""MinHash signatures and LSH buckets for near-duplicate tool detection."""
+
+from __future__ import annotations
+
+import hashlib
+import struct
+from typing import Dict, List, Optional, Set, Tuple
+
+from .tool_index import tokenize
+
+
+def shingles(text: str) -> Set[str]:
+    """Words and adjacent word pairs of ``text``, ignoring stopwords."""
+    words = tokenize(text)
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+class MinHashLSH:
+    """Finds descriptions whose shingle sets have a high Jaccard similarity.
+
+    Each shingle is hashed once with SHAKE-128 into ``num_perm`` independent
+    32-bit values; the signature is their element-wise minimum over all
+    shingles, and the fraction of equal positions in two signatures estimates
+    the Jaccard similarity. Signatures are split into ``bands`` and bucketed
+    by band, so a query only compares against entries sharing a bucket.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.8):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands.")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self._unpack = struct.Struct(f"<{num_perm}I").unpack
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        # Insertion sequence, so ties go to the entry added first.
+        self._sequence: Dict[str, int] = {}
+        self._added = 0
+        self._buckets: List[Dict[Tuple[int, ...], Set[str]]] = [
+            {} for _ in range(bands)
+        ]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, text: str) -> Optional[Tuple[int, ...]]:
+        """Return the MinHash signature of ``text``, or ``None`` if it has no words."""
+        hashed = [
+            self._unpack(hashlib.shake_128(s.encode("utf-8")).digest(4 * self.num_perm))
+            for s in shingles(text)
+        ]
+        return tuple(map(min, zip(*hashed))) if hashed else None
+
+    def add(self, name: str, text: str) -> None:
+        self.remove(name)
+        signature = self.signature(text)
+        if signature is None:
+            return
+        self._signatures[name] = signature
+        self._sequence[name] = self._added
+        self._added += 1
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(key, set()).add(name)
+
+    def remove(self, name: str) -> None:
+        signature = self._signatures.pop(name, None)
+        if signature is None:
+            return
+        del self._sequence[name]
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band][key]
+            bucket.discard(name)
+            if not bucket:
+                del self._buckets[band][key]
+
+    def query(
+        self, text: str, exclude: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        """Entries estimated at least ``threshold`` similar to ``text``, best first."""
+        signature = self.signature(text)
+        if signature is None:
+            return []
+        return self._matches(signature, exclude)
+
+    def duplicate_pairs(self) -> List[Tuple[str, str, float]]:
+        """Every pair of entries at or above the threshold."""
+        pairs = []
+        for name, signature in self._signatures.items():
+            for other, similarity in self._matches(signature, name):
+                if name < other:
+                    pairs.append((name, other, similarity))
+        return pairs
+
+    def _matches(
+        self, signature: Tuple[int, ...], exclude: Optional[str]
+    ) -> List[Tuple[str, float]]:
+        candidates: Set[str] = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates |= self._buckets[band].get(key, set())
+        candidates.discard(exclude)
+        matches = []
+        for name in candidates:
+            similarity = self._similarity(signature, self._signatures[name])
+            if similarity >= self.threshold:
+                matches.append((name, similarity))
+        matches.sort(key=lambda item: (-item[1], self._sequence[item[0]]))
+        return matches
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield signature[band * self.rows : (band + 1) * self.rows]
+
+    def _similarity(self, a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+        return sum(x == y for x, y in zip(a, b)) / self.num_perm
@@ -0,0 +1,94 @@
+"""Inverted index used to retrieve candidate tools by description."""
+
+from __future__ import annotations
+
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Set, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Words that carry no signal in tool descriptions ("A tool that can: ...").
+STOPWORDS = frozenset(
+    """a an and are as at be by can for from in into is it of on or that the
+    this to tool with""".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over short documents, keyed by document id.
+
+    Postings map each term to the documents containing it, so a search only
+    touches documents sharing a term with the query. Terms found in more than
+    ``max_df_ratio`` of all documents are skipped during candidate generation
+    (unless the query has nothing rarer), which keeps very common words from
+    turning every search into a full scan.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, max_df_ratio: float = 0.5):
+        self.k1 = k1
+        self.b = b
+        self.max_df_ratio = max_df_ratio
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Counter] = {}
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_terms
+
+    def add(self, doc_id: str, text: str) -> None:
+        """Index ``text`` under ``doc_id``, replacing any previous version."""
+        self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        self._doc_terms[doc_id] = terms
+        self._lengths[doc_id] = sum(terms.values())
+        self._total_length += self._lengths[doc_id]
+        for term, freq in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = freq
+
+    def remove(self, doc_id: str) -> None:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Return up to ``k`` ``(doc_id, score)`` pairs, best first."""
+        n_docs = len(self._doc_terms)
+        if not n_docs:
+            return []
+        terms = self._query_terms(set(tokenize(query)), n_docs)
+        avg_length = self._total_length / n_docs or 1.0
+        scores: Dict[str, float] = {}
+        for term in terms:
+            postings = self._postings[term]
+            df = len(postings)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for doc_id, freq in postings.items():
+                length = self._lengths[doc_id]
+                norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * (
+                    freq * (self.k1 + 1) / (freq + norm)
+                )
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def _query_terms(self, terms: Set[str], n_docs: int) -> List[str]:
+        present = [t for t in terms if t in self._postings]
+        limit = max(1, self.max_df_ratio * n_docs)
+        selective = [t for t in present if len(self._postings[t]) <= limit]
+        return selective or present
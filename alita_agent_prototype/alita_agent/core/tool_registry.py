@@ -2,54 +2,248 @@
 
 from __future__ import annotations
 
-import json
 import difflib
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from ..utils.logging import setup_logging
+from .tool_dedup import MinHashLSH
+from .tool_index import BM25Index
+from .tool_store import FileToolStore, ToolStore
+from .tool_vectors import VectorIndex
 
 
 class ToolRegistry:
-    """Manages stored tools and supports simple similarity search."""
+    """Manages stored tools and supports simple similarity search.
 
-    def __init__(self, tools_dir: Path):
+    Tools saved by other processes are picked up incrementally: the store is
+    polled at most every ``refresh_interval`` seconds before a search, and
+    whenever a lookup misses. Each poll only loads what changed since the
+    previous one. ``generation`` increases whenever the set of tools changes.
+
+    Descriptions are kept in a BM25 inverted index, so a search scores only
+    tools sharing a word with the query and re-ranks the best
+    ``rerank_depth`` of them with ``difflib`` instead of comparing against
+    every stored tool. When a :class:`VectorIndex` is given, a query with no
+    close textual match falls back to the most similar embedding whose cosine
+    reaches ``semantic_threshold``.
+
+    Registering a tool whose description is a near duplicate of an existing
+    one (MinHash-estimated Jaccard similarity of at least ``dedup_threshold``)
+    is logged and recorded in ``duplicates``. The MinHash index is built on
+    first use, so loading a large registry doesn't pay for it up front.
+
+    Lookup results are kept in an LRU cache of ``lookup_cache_size`` entries
+    keyed by the query with runs of whitespace collapsed (case is kept, since
+    it affects scoring); the whole cache is dropped whenever ``generation``
+    changes.
+    """
+
+    def __init__(
+        self,
+        tools_dir: Path,
+        store: Optional[ToolStore] = None,
+        refresh_interval: Optional[float] = 5.0,
+        rerank_depth: int = 10,
+        vectors: Optional[VectorIndex] = None,
+        semantic_threshold: float = 0.75,
+        dedup_threshold: float = 0.8,
+        lookup_cache_size: int = 1024,
+    ):
         self.logger = setup_logging("ToolRegistry")
         self.tools_dir = Path(tools_dir)
+        self.store = store or FileToolStore(self.tools_dir)
+        self.refresh_interval = refresh_interval
+        self.rerank_depth = rerank_depth
         self.tools: Dict[str, str] = {}
+        self.index = BM25Index()
+        self.vectors = vectors
+        self.semantic_threshold = semantic_threshold
+        self.dedup = MinHashLSH(threshold=dedup_threshold)
+        self._dedup_built = False
+        # new tool name -> existing tool it near-duplicates
+        self.duplicates: Dict[str, str] = {}
+        self.generation = 0
+        self.lookup_cache_size = lookup_cache_size
+        # normalized query -> (tool name or None, score)
+        self._lookups: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+        self._lookup_generation = 0
+        self.lookup_hits = 0
+        self.lookup_misses = 0
+        self._cursor: Any = None
+        self._last_refresh = 0.0
         self._load_tools()
 
     def _load_tools(self) -> None:
-        """Load existing tools from disk."""
-        if not self.tools_dir.exists():
-            return
-        for meta_file in self.tools_dir.glob("*.meta.json"):
-            try:
-                data = json.loads(meta_file.read_text())
-                name = data.get("name")
-                desc = data.get("description", "")
-                if name:
-                    self.tools[name] = desc
-            except Exception as e:
-                self.logger.warning(f"Failed to load {meta_file}: {e}")
-
-    def register_tool(self, name: str, description: str) -> None:
-        """Register a newly created tool."""
+        """Load existing tools from the tool store."""
+        self.refresh()
+
+    def refresh(self) -> int:
+        """Load tools added or changed since the last refresh; return how many."""
+        changes, self._cursor = self.store.changes_since(self._cursor)
+        self._last_refresh = time.monotonic()
+        changed = {
+            name: desc for name, desc in changes.items() if self.tools.get(name) != desc
+        }
+        if changed:
+            self.logger.debug(f"Loaded {len(changed)} new or changed tools")
+            self.tools.update(changed)
+            for name, desc in changed.items():
+                self.index.add(name, desc)
+            if self.vectors is not None:
+                self.vectors.add_many(list(changed.items()))
+            if self._dedup_built:
+                for name, desc in changed.items():
+                    self.dedup.add(name, desc)
+            self.generation += 1
+        return len(changed)
+
+    def _poll(self) -> None:
+        if (
+            self.refresh_interval is not None
+            and time.monotonic() - self._last_refresh >= self.refresh_interval
+        ):
+            self.refresh()
+
+    def register_tool(self, name: str, description: str) -> Optional[str]:
+        """Register a newly created tool.
+
+        Returns the name of an existing tool it near-duplicates, if any.
+        """
         self.logger.info(f"Registering tool '{name}'")
+        duplicate = self.find_duplicate(description, exclude=name)
+        if duplicate:
+            self.logger.warning(f"Tool '{name}' is a near duplicate of '{duplicate}'")
+            self.duplicates[name] = duplicate
         self.tools[name] = description
+        self.index.add(name, description)
+        if self.vectors is not None:
+            self.vectors.add(name, description)
+        self.dedup.add(name, description)
+        self.generation += 1
+        return duplicate
 
     def tool_exists(self, name: str) -> bool:
+        if name in self.tools:
+            return True
+        self.refresh()
         return name in self.tools
 
+    def top_k(self, description: str, k: int = 5) -> List[Tuple[str, float]]:
+        """Return up to ``k`` ``(name, similarity)`` pairs, most similar first.
+
+        Similarity is the ``difflib`` ratio between the stored description and
+        ``description``; candidates come from the BM25 index.
+        """
+        self._poll()
+        candidates = self.index.search(description, max(k, self.rerank_depth))
+        scored = [
+            (name, difflib.SequenceMatcher(None, self.tools[name], description).ratio())
+            for name, _ in candidates
+        ]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:k]
+
+    def similar_tools(self, description: str, k: int = 5) -> List[Tuple[str, float]]:
+        """Return up to ``k`` ``(name, cosine)`` pairs from the vector index."""
+        if self.vectors is None:
+            return []
+        self._poll()
+        return self.vectors.search(description, k)
+
     def find_tool_by_description(self, description: str) -> Optional[str]:
         """Return the name of the most similar tool by description."""
-        if not self.tools:
-            return None
-        best_name = None
-        best_score = 0.0
-        for name, desc in self.tools.items():
-            score = difflib.SequenceMatcher(None, desc, description).ratio()
-            if score > best_score:
-                best_score = score
-                best_name = name
-        return best_name if best_score > 0.6 else None
+        return self.match(description)[0]
+
+    def match(self, description: str) -> Tuple[Optional[str], float]:
+        """Return the best matching tool and its score, using the lookup cache.
+
+        The name is ``None`` when nothing passes the similarity thresholds.
+        """
+        self._poll()
+        if self._lookup_generation != self.generation:
+            self._lookups.clear()
+            self._lookup_generation = self.generation
+        # Scored as the key is, so a hit returns exactly what a miss would.
+        key = " ".join(description.split())
+        cached = self._lookups.get(key)
+        if cached is not None:
+            self._lookups.move_to_end(key)
+            self.lookup_hits += 1
+            return cached
+        self.lookup_misses += 1
+        result = self._best_match(key)
+        if self.lookup_cache_size > 0:
+            self._lookups[key] = result
+            if len(self._lookups) > self.lookup_cache_size:
+                self._lookups.popitem(last=False)
+        return result
+
+    @property
+    def lookup_hit_rate(self) -> float:
+        lookups = self.lookup_hits + self.lookup_misses
+        return self.lookup_hits / lookups if lookups else 0.0
+
+    def _best_match(self, description: str) -> Tuple[Optional[str], float]:
+        best = self.top_k(description, 1)
+        if best and best[0][1] > 0.6:
+            return best[0]
+        semantic = self.similar_tools(description, 1)
+        if semantic and semantic[0][1] >= self.semantic_threshold:
+            return semantic[0]
+        return None, best[0][1] if best else 0.0
+
+    def find_duplicate(
+        self, description: str, exclude: Optional[str] = None
+    ) -> Optional[str]:
+        """Return the tool whose description near-duplicates ``description``."""
+        self._build_dedup()
+        matches = self.dedup.query(description, exclude=exclude)
+        return matches[0][0] if matches else None
+
+    def dedup_report(self) -> List[Dict[str, Any]]:
+        """Group registered tools into clusters of near duplicates.
+
+        Each cluster names the earliest registered tool as ``canonical`` and
+        lists the others under ``duplicates`` with the lowest pairwise
+        ``similarity`` found between linked members.
+        """
+        self._build_dedup()
+        order = {name: i for i, name in enumerate(self.tools)}
+        parent: Dict[str, str] = {}
+
+        def root(name: str) -> str:
+            while parent.get(name, name) != name:
+                name = parent[name]
+            return name
+
+        links = self.dedup.duplicate_pairs()
+        for a, b, _ in links:
+            ra, rb = root(a), root(b)
+            if ra != rb:
+                first, second = sorted((ra, rb), key=order.__getitem__)
+                parent[second] = first
+        clusters: Dict[str, Dict[str, Any]] = {}
+        for a, b, similarity in links:
+            cluster = clusters.setdefault(
+                root(a), {"canonical": root(a), "duplicates": set(), "similarity": 1.0}
+            )
+            cluster["duplicates"].update({a, b} - {cluster["canonical"]})
+            cluster["similarity"] = min(cluster["similarity"], similarity)
+        return [
+            {**c, "duplicates": sorted(c["duplicates"], key=order.__getitem__)}
+            for c in sorted(clusters.values(), key=lambda c: order[c["canonical"]])
+        ]
+
+    def _build_dedup(self) -> None:
+        if not self._dedup_built:
+            for name, desc in self.tools.items():
+                self.dedup.add(name, desc)
+            self._dedup_built = True
+
+    def close(self) -> None:
+        """Persist the vector index, if any."""
+        if self.vectors is not None:
+            self.vectors.save()
@@ -0,0 +1,416 @@
+"""Tool Store: persistence backends for generated tools."""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from ..config.settings import AlitaConfig
+from ..utils.helpers import atomic_write_text, content_hash
+from ..utils.logging import setup_logging
+from ..utils.tool_stats import ResourceUsage
+
+
+class StoredTool(BaseModel):
+    """A tool as kept by a :class:`ToolStore`."""
+
+    name: str
+    description: str = ""
+    code: str
+    metadata: Dict[str, Any] = {}
+    version: int = 1
+    # Execution totals; only tracked by stores that persist them.
+    calls: int = 0
+    failures: int = 0
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+
+
+class ToolStore(ABC):
+    """Interface of the tool persistence backends."""
+
+    @abstractmethod
+    def get_tool(self, name: str) -> Optional[StoredTool]:
+        """Return the tool, or ``None`` if it doesn't exist."""
+
+    def get_code(self, name: str) -> Optional[str]:
+        tool = self.get_tool(name)
+        return tool.code if tool else None
+
+    @abstractmethod
+    def get_metadata(self, name: str) -> Dict[str, Any]:
+        """Return the tool's metadata, or ``{}`` if it doesn't exist."""
+
+    @abstractmethod
+    def exists(self, name: str) -> bool:
+        """Whether a tool named ``name`` is stored."""
+
+    @abstractmethod
+    def save(self, name: str, code: str, metadata: Dict[str, Any]) -> int:
+        """Create or replace a tool and return its new version."""
+
+    def descriptions(self) -> Dict[str, str]:
+        """Return the description of every stored tool by name."""
+        return self.changes_since(None)[0]
+
+    @abstractmethod
+    def changes_since(self, cursor: Any) -> Tuple[Dict[str, str], Any]:
+        """Return descriptions of tools added or changed since ``cursor``.
+
+        Also returns the cursor to pass next time; ``None`` means "from the
+        beginning". Cursors are opaque and only meaningful to the same store.
+        """
+
+    def record_execution(
+        self, name: str, usage: Optional[ResourceUsage], success: bool
+    ) -> None:
+        """Add one execution to the tool's persisted totals, if supported."""
+
+    def flush(self) -> None:
+        """Wait until every recorded execution has been persisted."""
+
+    def close(self) -> None:
+        pass
+
+
+class FileToolStore(ToolStore):
+    """Tools kept as ``<name>.py`` and ``<name>.meta.json`` file pairs.
+
+    Both files are replaced atomically and the metadata file is written last,
+    since its presence marks the tool as complete.
+    """
+
+    RACY_WINDOW_NS = 2_000_000_000
+
+    def __init__(self, tools_dir: Path):
+        self.logger = setup_logging("FileToolStore")
+        self.tools_dir = Path(tools_dir)
+
+    def get_tool(self, name: str) -> Optional[StoredTool]:
+        code = self.get_code(name)
+        if code is None:
+            return None
+        metadata = self.get_metadata(name)
+        return StoredTool(
+            name=name,
+            description=metadata.get("description", ""),
+            code=code,
+            metadata=metadata,
+            version=metadata.get("version", 1),
+        )
+
+    def get_code(self, name: str) -> Optional[str]:
+        try:
+            return (self.tools_dir / f"{name}.py").read_bytes().decode("utf-8")
+        except FileNotFoundError:
+            return None
+
+    def get_metadata(self, name: str) -> Dict[str, Any]:
+        try:
+            return json.loads((self.tools_dir / f"{name}.meta.json").read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def exists(self, name: str) -> bool:
+        return (self.tools_dir / f"{name}.meta.json").exists()
+
+    def save(self, name: str, code: str, metadata: Dict[str, Any]) -> int:
+        version = self.get_metadata(name).get("version", 0) + 1
+        atomic_write_text(self.tools_dir / f"{name}.py", code)
+        atomic_write_text(
+            self.tools_dir / f"{name}.meta.json",
+            json.dumps({**metadata, "name": name, "version": version}, indent=2),
+        )
+        return version
+
+    def changes_since(self, cursor: Any) -> Tuple[Dict[str, str], Any]:
+        """Load only metadata files that are new or changed since ``cursor``.
+
+        The cursor holds the directory's mtime and an mtime index of the
+        metadata files. Tools are saved with ``os.replace``, which updates the
+        directory mtime, so an unchanged directory is answered with a single
+        ``stat``; otherwise the directory is listed but only changed files are
+        read.
+        """
+        try:
+            dir_mtime = self.tools_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            return {}, cursor
+        seen_mtime, index = cursor or (None, {})
+        if dir_mtime == seen_mtime:
+            return {}, cursor
+        scanned_at = time.time_ns()
+        tools: Dict[str, str] = {}
+        new_index: Dict[str, int] = {}
+        for entry in os.scandir(self.tools_dir):
+            if not entry.name.endswith(".meta.json"):
+                continue
+            try:
+                mtime = entry.stat().st_mtime_ns
+            except FileNotFoundError:
+                continue
+            new_index[entry.name] = mtime
+            if index.get(entry.name) == mtime:
+                continue
+            try:
+                data = json.loads(Path(entry.path).read_text())
+                name = data.get("name")
+                desc = data.get("description", "")
+                if name:
+                    tools[name] = desc
+            except Exception as e:
+                self.logger.warning(f"Failed to load {entry.path}: {e}")
+        # Changes within the mtime granularity of this scan could be missed,
+        # so keep listing the directory until it has been quiet for a while.
+        if scanned_at - dir_mtime < self.RACY_WINDOW_NS:
+            dir_mtime = None
+        return tools, (dir_mtime, new_index)
+
+
+class SQLiteToolStore(ToolStore):
+    """Tools kept in a SQLite database that several agent processes can share.
+
+    The database runs in WAL mode so readers never block the writer, and each
+    save is a single upsert transaction that bumps the tool's version. Every
+    save also stamps the row with the next value of a store-wide generation
+    counter, which lets readers fetch only what changed. When the database is
+    first created, tools saved as file pairs in ``import_dir`` are imported.
+
+    Execution totals are written behind: ``record_execution`` only adds to
+    per-tool totals in memory, and a background thread writes everything
+    recorded so far in one transaction, so callers on the event loop never
+    wait for SQLite.
+    """
+
+    SCHEMA_VERSION = 1
+
+    def __init__(self, db_path: Path, import_dir: Optional[Path] = None):
+        self.logger = setup_logging("SQLiteToolStore")
+        self.db_path = Path(db_path)
+        self._conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate(import_dir)
+        # name -> [calls, failures, wall time, cpu time, last used]
+        self._pending_stats: Dict[str, List[float]] = {}
+        self._stats_lock = threading.Lock()
+        self._stats_writer = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="alita-tool-stats"
+        )
+        self._stats_write: Optional[Future] = None
+        self._stats_scheduled = False
+
+    def get_tool(self, name: str) -> Optional[StoredTool]:
+        self.flush()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM tools WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return StoredTool(
+            name=row["name"],
+            description=row["description"],
+            code=row["code"],
+            metadata=json.loads(row["metadata"]),
+            version=row["version"],
+            calls=row["calls"],
+            failures=row["failures"],
+            wall_time=row["wall_time"],
+            cpu_time=row["cpu_time"],
+        )
+
+    def get_code(self, name: str) -> Optional[str]:
+        row = self._fetch_one("SELECT code FROM tools WHERE name = ?", name)
+        return row["code"] if row else None
+
+    def get_metadata(self, name: str) -> Dict[str, Any]:
+        row = self._fetch_one("SELECT metadata FROM tools WHERE name = ?", name)
+        return json.loads(row["metadata"]) if row else {}
+
+    def exists(self, name: str) -> bool:
+        return self._fetch_one("SELECT 1 FROM tools WHERE name = ?", name) is not None
+
+    def save(self, name: str, code: str, metadata: Dict[str, Any]) -> int:
+        metadata = {**metadata, "name": name}
+        now = time.time()
+        with self._lock, self._transaction():
+            self._upsert(name, code, metadata, now)
+            return self._conn.execute(
+                "SELECT version FROM tools WHERE name = ?", (name,)
+            ).fetchone()["version"]
+
+    def changes_since(self, cursor: Any) -> Tuple[Dict[str, str], Any]:
+        generation = cursor or 0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, description, generation FROM tools"
+                " WHERE generation > ?",
+                (generation,),
+            ).fetchall()
+        for row in rows:
+            generation = max(generation, row["generation"])
+        return {row["name"]: row["description"] for row in rows}, generation
+
+    def record_execution(
+        self, name: str, usage: Optional[ResourceUsage], success: bool
+    ) -> None:
+        wall_time = usage.wall_time if usage else 0.0
+        cpu_time = (usage.user_time or 0.0) + (usage.sys_time or 0.0) if usage else 0.0
+        with self._stats_lock:
+            totals = self._pending_stats.setdefault(name, [0, 0, 0.0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += 0 if success else 1
+            totals[2] += wall_time
+            totals[3] += cpu_time
+            totals[4] = time.time()
+            if not self._stats_scheduled:
+                self._stats_scheduled = True
+                self._stats_write = self._stats_writer.submit(self._write_stats)
+
+    def flush(self) -> None:
+        with self._stats_lock:
+            write = self._stats_write
+        if write is not None:
+            write.result()
+
+    def close(self) -> None:
+        self.flush()
+        self._stats_writer.shutdown()
+        with self._lock:
+            self._conn.close()
+
+    def _write_stats(self) -> None:
+        """Persist pending execution totals until none are left."""
+        while True:
+            with self._stats_lock:
+                pending, self._pending_stats = self._pending_stats, {}
+                if not pending:
+                    self._stats_scheduled = False
+                    return
+            try:
+                with self._lock, self._transaction():
+                    self._conn.executemany(
+                        "UPDATE tools SET calls = calls + ?, failures = failures + ?,"
+                        " wall_time = wall_time + ?, cpu_time = cpu_time + ?,"
+                        " last_used = ? WHERE name = ?",
+                        [(*totals, name) for name, totals in pending.items()],
+                    )
+            except sqlite3.Error as e:
+                self.logger.error(f"Failed to record {len(pending)} tools' usage: {e}")
+
+    def _fetch_one(self, query: str, name: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(query, (name,)).fetchone()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _upsert(
+        self, name: str, code: str, metadata: Dict[str, Any], now: float
+    ) -> None:
+        self._conn.execute(
+            "INSERT INTO tools (name, description, code, code_hash, metadata,"
+            " version, created_at, updated_at, generation)"
+            " VALUES (?, ?, ?, ?, ?, 1, ?, ?,"
+            " (SELECT COALESCE(MAX(generation), 0) + 1 FROM tools))"
+            " ON CONFLICT(name) DO UPDATE SET description = excluded.description,"
+            " code = excluded.code, code_hash = excluded.code_hash,"
+            " metadata = excluded.metadata, version = tools.version + 1,"
+            " updated_at = excluded.updated_at, generation = excluded.generation",
+            (
+                name,
+                metadata.get("description", ""),
+                code,
+                content_hash(code),
+                json.dumps(metadata),
+                now,
+                now,
+            ),
+        )
+
+    def _migrate(self, import_dir: Optional[Path]) -> None:
+        with self._lock, self._transaction():
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= self.SCHEMA_VERSION:
+                return
+            self._create_tables()
+            if import_dir is not None:
+                imported = self._import_files(FileToolStore(import_dir))
+                if imported:
+                    self.logger.info(f"Imported {imported} tools from {import_dir}")
+            self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def _create_tables(self) -> None:
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tools ("
+            " name TEXT PRIMARY KEY,"
+            " description TEXT NOT NULL DEFAULT '',"
+            " code TEXT NOT NULL,"
+            " code_hash TEXT NOT NULL,"
+            " metadata TEXT NOT NULL DEFAULT '{}',"
+            " version INTEGER NOT NULL DEFAULT 1,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " calls INTEGER NOT NULL DEFAULT 0,"
+            " failures INTEGER NOT NULL DEFAULT 0,"
+            " wall_time REAL NOT NULL DEFAULT 0,"
+            " cpu_time REAL NOT NULL DEFAULT 0,"
+            " last_used REAL,"
+            " generation INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS tools_code_hash ON tools (code_hash)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS tools_updated_at ON tools (updated_at)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS tools_generation ON tools (generation)"
+        )
+
+    def _import_files(self, files: FileToolStore) -> int:
+        imported = 0
+        now = time.time()
+        for name in files.descriptions():
+            tool = files.get_tool(name)
+            if tool is None:
+                continue
+            self._upsert(name, tool.code, tool.metadata, now)
+            imported += 1
+        return imported
+
+
+def open_tool_store(config: AlitaConfig) -> ToolStore:
+    """Open the tool store backend selected by ``mcp.tool_store``."""
+    tools_dir = config.get_workspace_path("tools")
+    backend = config.mcp.get("tool_store", "files")
+    if backend == "files":
+        return FileToolStore(tools_dir)
+    if backend == "sqlite":
+        return SQLiteToolStore(tools_dir / "tools.sqlite3", import_dir=tools_dir)
+    raise ValueError(f"Unknown tool store backend: {backend!r}")
@@ -0,0 +1,186 @@
+"""Offline vector index of tool descriptions for semantic lookup."""
+
+from __future__ import annotations
+
+import json
+import os
+import uuid
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..utils.helpers import atomic_write_text, content_hash
+from ..utils.logging import setup_logging
+from .tool_index import tokenize
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is an optional dependency
+    np = None
+
+
+def vectors_available() -> bool:
+    return np is not None
+
+
+def _features(text: str) -> List[str]:
+    """Words plus character trigrams of each word, so morphology overlaps."""
+    features = []
+    for word in tokenize(text):
+        features.append(word)
+        padded = f" {word} "
+        features.extend(padded[i : i + 3] for i in range(len(padded) - 2))
+    return features
+
+
+class VectorIndex:
+    """Hashed n-gram embeddings of descriptions in a NumPy matrix.
+
+    Each description is mapped to a ``dim``-dimensional vector by hashing
+    its words and character trigrams (signed feature hashing with CRC32, so
+    vectors are stable across processes) and normalizing to unit length;
+    cosine similarity is then a single matrix-vector product. Rows are
+    appended in place, growing the matrix geometrically. With ``path`` set,
+    ``save`` writes the matrix as ``.npy`` (names go to a ``.json`` sidecar)
+    and the next process memory-maps it instead of re-embedding every tool.
+    """
+
+    def __init__(self, dim: int = 256, path: Optional[Path] = None):
+        if np is None:
+            raise RuntimeError("VectorIndex requires numpy.")
+        self.logger = setup_logging("VectorIndex")
+        self.dim = dim
+        self.path = Path(path) if path else None
+        self.names: List[str] = []
+        # Hash of the text each row was embedded from, to skip re-embedding.
+        self._hashes: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._dirty = False
+        if self.path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._rows
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        """Return unit-length embeddings of ``texts``, one row each."""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in _features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add(self, name: str, text: str) -> None:
+        """Embed ``text`` under ``name``, replacing any previous vector."""
+        self.add_many([(name, text)])
+
+    def add_many(self, items: Sequence[Tuple[str, str]]) -> int:
+        """Embed ``(name, text)`` pairs in one batch; return how many changed.
+
+        Pairs whose text is already indexed under that name are skipped, so
+        re-adding every tool after loading a saved index is cheap.
+        """
+        pending = {}
+        for name, text in items:
+            digest = content_hash(text)
+            row = self._rows.get(name)
+            if row is None or self._hashes[row] != digest:
+                pending[name] = (text, digest)
+        if not pending:
+            return 0
+        vectors = self.embed([text for text, _ in pending.values()])
+        self._writable(len(self.names) + len(pending))
+        for (name, (_, digest)), vector in zip(pending.items(), vectors):
+            row = self._rows.get(name)
+            if row is None:
+                row = len(self.names)
+                self._rows[name] = row
+                self.names.append(name)
+                self._hashes.append(digest)
+            self._hashes[row] = digest
+            self._matrix[row] = vector
+        self._dirty = True
+        return len(pending)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        """Return up to ``k`` ``(name, cosine)`` pairs, most similar first."""
+        return self.search_batch([query], k)[0]
+
+    def search_batch(
+        self, queries: Sequence[str], k: int = 5
+    ) -> List[List[Tuple[str, float]]]:
+        """Top-``k`` matches for each query, scored in one matrix product."""
+        n = len(self.names)
+        if not n or not queries:
+            return [[] for _ in queries]
+        scores = self.embed(queries) @ self._matrix[:n].T
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for query_scores, candidates in zip(scores, top):
+            ranked = candidates[np.argsort(-query_scores[candidates])]
+            results.append([(self.names[i], float(query_scores[i])) for i in ranked])
+        return results
+
+    def save(self) -> None:
+        """Write the index to ``path`` if it changed since the last save."""
+        if not self.path or not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, self._matrix[: len(self.names)])
+            os.replace(tmp_path, self.path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        atomic_write_text(
+            self._names_path(),
+            json.dumps({"dim": self.dim, "names": self.names, "hashes": self._hashes}),
+        )
+        self._dirty = False
+
+    def _names_path(self) -> Path:
+        return self.path.with_suffix(".json")
+
+    def _load(self) -> None:
+        try:
+            header = json.loads(self._names_path().read_text())
+            matrix = np.load(self.path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            if self.path.exists():
+                self.logger.warning(f"Ignoring unreadable vector index: {e}")
+            return
+        names = header.get("names", [])
+        hashes = header.get("hashes", [])
+        if (
+            header.get("dim") != self.dim
+            or len(hashes) != len(names)
+            or matrix.shape != (len(names), self.dim)
+        ):
+            # Saved by a different configuration or torn between the two
+            # files; re-embedding is cheaper than trusting it.
+            self.logger.warning("Vector index does not match its names; ignoring")
+            return
+        self.names = list(names)
+        self._hashes = list(hashes)
+        self._rows = {name: row for row, name in enumerate(self.names)}
+        self._matrix = matrix
+
+    def _writable(self, rows: int) -> None:
+        """Make the matrix an in-memory array with room for ``rows`` rows."""
+        capacity = self._matrix.shape[0]
+        # A loaded index is a read-only memory map until the first append.
+        if rows <= capacity and self._matrix.flags.writeable:
+            return
+        new_capacity = max(rows, 2 * capacity, 64)
+        grown = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        grown[: len(self.names)] = self._matrix[: len(self.names)]
+        self._matrix = grown
@@ -20,3 +20,9 @@ class PlanningError(AlitaError):
     """Raised during a planning failure."""
 
     pass
+
+
+class SandboxError(AlitaError):
+    """Raised when the sandbox infrastructure itself fails."""
+
+    pass
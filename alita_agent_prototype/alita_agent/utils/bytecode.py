@@ -0,0 +1,51 @@
+"""Precompiled bytecode for generated tools.
+
+Tools are compiled into standard hash-based ``.pyc`` files (PEP 552) stored in
+the tools directory, so sandbox workers can load code objects directly and
+one-shot interpreters can run the ``.pyc`` without recompiling the source.
+The ``.pyc`` is built from the source text itself, which need not exist as a
+file (e.g. when tools live in the SQLite tool store).
+"""
+
+import importlib.util
+import marshal
+from pathlib import Path
+
+from .helpers import atomic_write_bytes
+
+# magic number (4 bytes) + flags (4 bytes) + source hash (8 bytes)
+HEADER_SIZE = 16
+# Flags of a hash-based pyc whose source hash is checked on import.
+_CHECKED_HASH_FLAGS = 0b11
+
+
+def compile_tool(source: bytes, pyc_path: Path, filename: str = "<tool>") -> bool:
+    """Compile ``source`` into a checked hash-based ``.pyc`` file.
+
+    ``filename`` is what tracebacks show for the code. Returns ``False`` if
+    the source does not compile.
+    """
+    try:
+        code = compile(source, filename, "exec", dont_inherit=True)
+    except (SyntaxError, ValueError):
+        return False
+    data = bytearray(importlib.util.MAGIC_NUMBER)
+    data += _CHECKED_HASH_FLAGS.to_bytes(4, "little")
+    data += importlib.util.source_hash(source)
+    data += marshal.dumps(code)
+    atomic_write_bytes(pyc_path, bytes(data))
+    return True
+
+
+def is_fresh(pyc_path: Path, source: bytes) -> bool:
+    """Whether ``pyc_path`` was compiled from ``source`` by this interpreter."""
+    try:
+        with open(pyc_path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+    except OSError:
+        return False
+    return (
+        len(header) == HEADER_SIZE
+        and header[:4] == importlib.util.MAGIC_NUMBER
+        and header[8:] == importlib.util.source_hash(source)
+    )
@@ -0,0 +1,222 @@
+"""
+Pool of pre-started Docker containers for the docker sandbox path.
+
+Containers are started once with networking disabled and the script store
+mounted read-only, then kept alive so tool runs only pay for ``docker exec``
+instead of a full container cold start. Since one container serves many
+tools, it runs as an unprivileged user on a read-only root filesystem with
+memory and process limits; the only writable path, a ``/tmp`` tmpfs, is
+emptied at the start of every exec. Containers are recycled after a
+fixed number of runs and discarded whenever a run fails in a way that could
+leave them in an unknown state.
+"""
+
+import subprocess
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import List
+
+from ..exceptions import SandboxError
+from .logging import setup_logging
+
+CONTAINER_LABEL = "alita-sandbox"
+
+# Runs a tool script inside the container and reports the interpreter's own
+# resource usage on stderr, since the host can't wait4() a process that lives
+# in another PID namespace.
+USAGE_MARKER = "__alita_usage__"
+USAGE_BOOTSTRAP = """\
+import atexit, json, resource, runpy, sys
+
+def _report():
+    u = resource.getrusage(resource.RUSAGE_SELF)
+    usage = {"user_time": u.ru_utime, "sys_time": u.ru_stime, "max_rss": u.ru_maxrss}
+    sys.stderr.write("\\n__alita_usage__" + json.dumps(usage) + "\\n")
+
+atexit.register(_report)
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+# Empties the scratch directory, so a tool can't read what an earlier one
+# left behind, then replaces itself with the Python command that follows.
+SCRATCH_DIR = "/tmp"
+CLEAN_LAUNCHER = """\
+import os, shutil, sys
+
+for entry in os.scandir(sys.argv[1]):
+    if entry.is_dir(follow_symlinks=False):
+        shutil.rmtree(entry.path)
+    else:
+        os.unlink(entry.path)
+os.execv(sys.executable, [sys.executable, *sys.argv[2:]])
+"""
+
+
+def script_command(script_name: str) -> List[str]:
+    """In-container command that runs a script from the mounted store."""
+    return ["python", "-c", USAGE_BOOTSTRAP, f"/app/{script_name}"]
+
+
+class SandboxContainer:
+    """A running container that tool scripts are executed in."""
+
+    def __init__(self, container_id: str):
+        self.container_id = container_id
+        self.runs = 0
+        self.started = time.monotonic()
+
+    def exec_command(self, script_name: str) -> List[str]:
+        """Return the command that runs ``script_name`` inside the container."""
+        return self.exec(script_command(script_name))
+
+    def exec(self, command: List[str]) -> List[str]:
+        """Return the ``docker exec`` invocation of ``command``.
+
+        ``command`` must start with ``python``, which is replaced by the
+        launcher that empties the scratch directory first.
+        """
+        return [
+            "docker",
+            "exec",
+            "-i",
+            self.container_id,
+            "python",
+            "-c",
+            CLEAN_LAUNCHER,
+            SCRATCH_DIR,
+            *command[1:],
+        ]
+
+
+class DockerContainerPool:
+    """Keeps up to ``size`` idle sandbox containers ready for reuse."""
+
+    def __init__(
+        self,
+        scripts_dir: Path,
+        image: str,
+        size: int,
+        max_runs: int,
+        lifetime: int = 3600,
+        memory: str = "512m",
+        pids_limit: int = 64,
+    ):
+        self.logger = setup_logging("DockerContainerPool")
+        self.scripts_dir = Path(scripts_dir)
+        self.image = image
+        self.size = size
+        self.max_runs = max_runs
+        self.memory = memory
+        self.pids_limit = pids_limit
+        # Containers exit on their own after ``lifetime`` seconds so that a
+        # crashed host process does not leak them forever.
+        self.lifetime = lifetime
+        self._idle: List[SandboxContainer] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self) -> None:
+        """Pre-start containers until the pool is full."""
+        with self._lock:
+            missing = 0 if self._closed else self.size - len(self._idle)
+        for _ in range(max(missing, 0)):
+            container = self._spawn()
+            with self._lock:
+                self._idle.append(container)
+
+    def acquire(self) -> SandboxContainer:
+        expired: List[str] = []
+        try:
+            with self._lock:
+                if self._closed:
+                    raise SandboxError("Docker container pool is closed.")
+                while self._idle:
+                    container = self._idle.pop()
+                    if not self._expiring(container):
+                        return container
+                    expired.append(container.container_id)
+        finally:
+            if expired:
+                self._remove(expired)
+        return self._spawn()
+
+    def release(self, container: SandboxContainer) -> None:
+        """Return a container to the pool or remove it once it is used up."""
+        container.runs += 1
+        with self._lock:
+            keep = (
+                not self._closed
+                and container.runs < self.max_runs
+                and len(self._idle) < self.size
+            )
+            if keep:
+                self._idle.append(container)
+                return
+        self.discard(container)
+
+    def discard(self, container: SandboxContainer) -> None:
+        self._remove([container.container_id])
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        if idle:
+            self._remove([c.container_id for c in idle])
+
+    def _expiring(self, container: SandboxContainer) -> bool:
+        """Whether the container is close to exiting on its own."""
+        return time.monotonic() - container.started > self.lifetime * 0.9
+
+    def _spawn(self) -> SandboxContainer:
+        name = f"{CONTAINER_LABEL}-{uuid.uuid4().hex[:12]}"
+        cmd = [
+            "docker",
+            "run",
+            "-d",
+            "--rm",
+            "--name",
+            name,
+            "--label",
+            CONTAINER_LABEL,
+            "--network",
+            "none",
+            "--read-only",
+            "--tmpfs",
+            f"{SCRATCH_DIR}:rw,nosuid,nodev,size=64m",
+            "--user",
+            "65534:65534",
+            "--cap-drop",
+            "ALL",
+            "--security-opt",
+            "no-new-privileges",
+            "--memory",
+            self.memory,
+            "--pids-limit",
+            str(self.pids_limit),
+            "-v",
+            f"{self.scripts_dir}:/app:ro",
+            "-w",
+            "/app",
+            self.image,
+            "sleep",
+            str(self.lifetime),
+        ]
+        self.logger.debug(f"Starting sandbox container {name}")
+        completed = subprocess.run(cmd, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise SandboxError(
+                f"Failed to start sandbox container: {completed.stderr.strip()}"
+            )
+        return SandboxContainer(completed.stdout.strip() or name)
+
+    def _remove(self, container_ids: List[str]) -> None:
+        subprocess.run(
+            ["docker", "rm", "-f", *container_ids],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
@@ -0,0 +1,55 @@
+"""Advisory file locks shared between agent processes."""
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+class FileLock:
+    """Exclusive advisory lock on ``path`` that also excludes other processes.
+
+    Waiting polls a non-blocking ``flock`` from the event loop, so it never
+    ties up an executor thread and can be cancelled at any time. Without
+    ``fcntl`` the lock is a no-op and only in-process coordination applies.
+    """
+
+    def __init__(self, path: Path, poll_interval: float = 0.05):
+        self.path = Path(path)
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+
+    def try_acquire(self) -> bool:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+        self._fd = fd
+        return True
+
+    async def acquire(self) -> None:
+        while not self.try_acquire():
+            await asyncio.sleep(self.poll_interval)
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    async def __aenter__(self) -> "FileLock":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
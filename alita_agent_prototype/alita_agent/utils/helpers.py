@@ -1,10 +1,34 @@
 """General utility functions for the Alita Agent Framework."""
 
+import hashlib
+import os
 import uuid
 from datetime import datetime
+from pathlib import Path
 
 
 def generate_unique_id(prefix: str = "item") -> str:
     """Generates a unique ID with a timestamp and random component."""
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
     return f"{prefix}_{timestamp}_{uuid.uuid4().hex[:6]}"
+
+
+def content_hash(text: str) -> str:
+    """Returns the SHA-256 hex digest identifying a piece of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """Writes a file so readers see either the old or the new content."""
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Binary counterpart of :func:`atomic_write_text`."""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,118 @@
+"""In-process execution of trusted tools."""
+
+import asyncio
+import inspect
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from .helpers import content_hash
+from .logging import setup_logging
+from .security import ToolExecutionResult
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+# Trust levels stored in a tool's metadata under ``"trust"``.
+TRUST_SANDBOXED = "sandboxed"
+TRUST_TRUSTED = "trusted"
+TRUST_LEVELS = (TRUST_SANDBOXED, TRUST_TRUSTED)
+
+
+class InProcessExecutor:
+    """Runs trusted tools' ``execute(params)`` directly on a thread pool.
+
+    Each distinct tool source is executed once into its own module namespace
+    and its ``execute`` function is reused, so a call costs a thread hand-off
+    instead of a sandbox round-trip, and results are returned as Python
+    objects without JSON serialization. Threads can't be interrupted: a call
+    that exceeds the timeout is reported as timed out but keeps running in
+    the background. Only audited tools should run here.
+    """
+
+    def __init__(
+        self, max_workers: int = 4, timeout: float = 60, cache_size: int = 128
+    ):
+        self.logger = setup_logging("InProcessExecutor")
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="alita-tool"
+        )
+        self._functions: "OrderedDict[str, Callable[[Any], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def execute(
+        self, code: str, parameters: Dict[str, Any]
+    ) -> ToolExecutionResult:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        future = loop.run_in_executor(self._pool, self._call, code, parameters)
+        try:
+            result = await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            result = ToolExecutionResult(success=False, error="Execution timed out.")
+        result.wall_time = time.perf_counter() - started
+        result.output_bytes = 0
+        return result
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _call(self, code: str, parameters: Dict[str, Any]) -> ToolExecutionResult:
+        before = self._thread_usage()
+        try:
+            value = self._function(code)(parameters)
+            if inspect.isgenerator(value):
+                partials: List[Any] = []
+                while True:
+                    try:
+                        partials.append(next(value))
+                    except StopIteration as stop:
+                        value = stop.value
+                        break
+                if value is None and partials:
+                    value = partials
+            result = ToolExecutionResult(success=True, result=value)
+        except Exception:
+            result = ToolExecutionResult(success=False, error=traceback.format_exc())
+        after = self._thread_usage()
+        if before and after:
+            result.user_time = after[0] - before[0]
+            result.sys_time = after[1] - before[1]
+        return result
+
+    def _function(self, code: str) -> Callable[[Any], Any]:
+        """Return the tool's ``execute``, importing the source on first use."""
+        key = content_hash(code)
+        with self._lock:
+            function = self._functions.get(key)
+            if function is not None:
+                self._functions.move_to_end(key)
+                return function
+        namespace = {
+            "__name__": f"alita_tool_{key[:12]}",
+            "report_progress": lambda data: None,
+        }
+        exec(compile(code, "<tool>", "exec"), namespace)
+        function = namespace.get("execute")
+        if not callable(function):
+            raise TypeError("Trusted tools must define execute(params).")
+        with self._lock:
+            self._functions[key] = function
+            if len(self._functions) > self.cache_size:
+                self._functions.popitem(last=False)
+        return function
+
+    @staticmethod
+    def _thread_usage():
+        """User and system CPU time of the calling thread, where available."""
+        if resource is not None and hasattr(resource, "RUSAGE_THREAD"):
+            usage = resource.getrusage(resource.RUSAGE_THREAD)
+            return usage.ru_utime, usage.ru_stime
+        return None
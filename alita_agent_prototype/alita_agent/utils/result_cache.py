@@ -0,0 +1,126 @@
+"""Memoized results of deterministic tools."""
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .helpers import content_hash
+from .logging import setup_logging
+
+# Returned by ``get`` on a miss, since ``None`` is a valid cached result.
+MISS = object()
+
+
+class ResultCache:
+    """LRU cache of tool results keyed by (code hash, canonical parameters).
+
+    Entries expire ``ttl`` seconds after they were stored (never when ``ttl``
+    is ``None``). When ``persist_dir`` is set every entry is also written there
+    as ``<key>.json`` so results survive restarts; entries evicted from memory
+    are removed from disk too. Values are stored as JSON text, so callers can
+    never mutate a cached result.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = None,
+        persist_dir: Optional[Path] = None,
+    ):
+        self.logger = setup_logging("ResultCache")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist_dir = Path(persist_dir) if persist_dir else None
+        if self.persist_dir:
+            self.persist_dir.mkdir(parents=True, exist_ok=True)
+        # key -> (stored at, JSON-encoded result)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(code: str, parameters: Dict[str, Any]) -> Optional[str]:
+        """Return the cache key of a call, or ``None`` if it can't be cached."""
+        try:
+            canonical = json.dumps(
+                parameters, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+            )
+        except (TypeError, ValueError):
+            return None
+        return content_hash(f"{content_hash(code)}:{canonical}")
+
+    def get(self, key: str) -> Any:
+        """Return the cached result for ``key`` or :data:`MISS`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._load(key)
+            if entry is not None and self._expired(entry[0]):
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return MISS
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return json.loads(entry[1])
+
+    def put(self, key: str, result: Any) -> None:
+        try:
+            encoded = json.dumps(result)
+        except (TypeError, ValueError):
+            return
+        entry = (time.time(), encoded)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if self.persist_dir:
+                self._store(key, entry)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+            if self.persist_dir:
+                for path in self.persist_dir.glob("*.json"):
+                    path.unlink(missing_ok=True)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def _drop(self, key: str) -> None:
+        self._entries.pop(key, None)
+        if self.persist_dir:
+            (self.persist_dir / f"{key}.json").unlink(missing_ok=True)
+
+    def _load(self, key: str) -> Optional[Tuple[float, str]]:
+        if not self.persist_dir:
+            return None
+        try:
+            payload = json.loads((self.persist_dir / f"{key}.json").read_text())
+            return payload["stored_at"], payload["result"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _store(self, key: str, entry: Tuple[float, str]) -> None:
+        path = self.persist_dir / f"{key}.json"
+        tmp_path = self.persist_dir / f".{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            tmp_path.write_text(json.dumps({"stored_at": entry[0], "result": entry[1]}))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning(f"Could not persist cached result {key}: {e}")
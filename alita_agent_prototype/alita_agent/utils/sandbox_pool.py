@@ -0,0 +1,186 @@
+"""
+Warm pool of sandbox worker processes.
+
+Each worker is a separate interpreter running ``sandbox_worker.py`` which has
+already imported the common modules tools rely on. Tool calls are dispatched
+to an idle worker over its stdin/stdout pipes, so a call only pays for the
+NDJSON round-trip instead of interpreter startup. A worker only ever runs one
+tool, since tools executed in the same interpreter share its modules and could
+change each other's behaviour. Workers are recycled after a fixed number of
+calls and replaced whenever they crash or time out.
+"""
+
+import json
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..exceptions import SandboxError
+from .logging import setup_logging
+
+WORKER_SCRIPT = Path(__file__).resolve().with_name("sandbox_worker.py")
+
+
+def worker_command(python_executable: str, preload: List[str]) -> List[str]:
+    """Command that starts a local worker process."""
+    return [python_executable, str(WORKER_SCRIPT), ",".join(preload)]
+
+
+class SandboxWorker:
+    """A single pre-started worker process.
+
+    ``command`` normally comes from :func:`worker_command` but may also run the
+    worker script elsewhere, e.g. inside a sandbox container. ``tool`` is the
+    code hash of the tool the worker is bound to, ``None`` until first use.
+    """
+
+    def __init__(self, command: List[str]):
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+        self.calls = 0
+        self.tool: Optional[str] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def send(self, payload: Dict[str, Any]) -> None:
+        """Send one request to the worker."""
+        self.calls += 1
+        try:
+            self.process.stdin.write(json.dumps(payload) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError) as e:
+            raise SandboxError(f"Sandbox worker pipe failed: {e}") from e
+
+    def read_line(self) -> str:
+        """Block until the worker writes its next NDJSON record."""
+        try:
+            line = self.process.stdout.readline()
+        except (OSError, ValueError) as e:
+            raise SandboxError(f"Sandbox worker pipe failed: {e}") from e
+        if not line:
+            raise SandboxError("Sandbox worker exited unexpectedly.")
+        return line
+
+    def close(self, timeout: float = 5) -> None:
+        """Let the worker exit by closing its stdin, killing it if it lingers."""
+        try:
+            self.process.stdin.close()
+        except Exception:
+            pass
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            pass
+        self.kill()
+
+    def kill(self) -> None:
+        if self.alive:
+            self.process.kill()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:  # pragma: no cover - defensive
+            pass
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+
+class WorkerPool:
+    """Keeps up to ``size`` warm workers around for reuse.
+
+    Acquiring never waits for a busy worker: when no idle worker can run the
+    tool a new one is started and, once released, it is either kept (if the
+    pool has room) or discarded. Overall concurrency is bounded by the caller.
+    """
+
+    def __init__(
+        self,
+        python_executable: str,
+        size: int,
+        max_calls: int,
+        preload: Optional[List[str]] = None,
+    ):
+        self.logger = setup_logging("WorkerPool")
+        self.python_executable = python_executable
+        self.size = size
+        self.max_calls = max_calls
+        self.preload = list(preload or [])
+        self._idle: List[SandboxWorker] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self) -> None:
+        """Pre-start workers until the pool is full."""
+        with self._lock:
+            while not self._closed and len(self._idle) < self.size:
+                self._idle.append(self._spawn())
+
+    def acquire(self, tool: str) -> SandboxWorker:
+        """Borrow a worker that has run nothing but ``tool`` (a code hash).
+
+        Prefers a worker already bound to ``tool``, then an unused one. When
+        the idle workers are all bound to other tools, the least recently
+        used one is retired to make room for a new worker.
+        """
+        retired: List[SandboxWorker] = []
+        worker: Optional[SandboxWorker] = None
+        with self._lock:
+            if self._closed:
+                raise SandboxError("Worker pool is closed.")
+            retired = [w for w in self._idle if not w.alive]
+            self._idle = [w for w in self._idle if w.alive]
+            for wanted in (tool, None):
+                worker = next((w for w in self._idle if w.tool == wanted), None)
+                if worker is not None:
+                    self._idle.remove(worker)
+                    break
+            else:
+                if len(self._idle) >= self.size and self._idle:
+                    retired.append(self._idle.pop(0))
+        for stale in retired:
+            stale.kill()
+        if worker is None:
+            worker = self._spawn()
+        worker.tool = tool
+        return worker
+
+    def release(self, worker: SandboxWorker) -> None:
+        """Return a healthy worker to the pool or retire it."""
+        with self._lock:
+            keep = (
+                not self._closed
+                and worker.alive
+                and worker.calls < self.max_calls
+                and len(self._idle) < self.size
+            )
+            if keep:
+                self._idle.append(worker)
+                return
+        self.logger.debug(f"Retiring sandbox worker after {worker.calls} calls")
+        worker.kill()
+
+    def discard(self, worker: SandboxWorker) -> None:
+        """Kill a worker whose state can no longer be trusted."""
+        worker.kill()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.kill()
+
+    def _spawn(self) -> SandboxWorker:
+        self.logger.debug("Starting sandbox worker process")
+        return SandboxWorker(worker_command(self.python_executable, self.preload))
@@ -0,0 +1,208 @@
+"""
+Long-lived sandbox worker process.
+
+This script is executed directly by path (never imported as part of the
+``alita_agent`` package) so that it only pays for the standard library at
+startup. It reads one JSON request per line on stdin, runs the tool's
+``execute(params)`` function and answers with NDJSON records on stdout (see
+``tool_stream.py``). Every request produces zero or more ``progress`` or
+``partial`` records followed by exactly one terminal record.
+
+Compiled code objects are cached per source hash for the worker's lifetime,
+and when the request names a precompiled ``.pyc`` compiled from the request's
+source the worker loads the code object from it instead of compiling the
+source. Once a hash is cached, later
+requests may omit ``code``; batch executions rely on this to stream many
+inputs without resending the source.
+
+Tools report progress by calling ``report_progress(data)``, which is injected
+into their globals, and stream partial results by making ``execute`` a
+generator; the generator's return value becomes the final result.
+"""
+
+import importlib.util
+import inspect
+import io
+import json
+import marshal
+import os
+import sys
+import traceback
+import types
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+_PROTOCOL_OUT = sys.__stdout__
+_CODE_CACHE = {}
+_CODE_CACHE_SIZE = 128
+
+
+def _preload(modules):
+    """Import commonly used modules up front so tool calls don't pay for them."""
+    for name in modules:
+        if not name:
+            continue
+        try:
+            __import__(name)
+        except Exception:
+            pass
+
+
+def _write(record):
+    _PROTOCOL_OUT.write(json.dumps(record) + "\n")
+    _PROTOCOL_OUT.flush()
+
+
+def _emit(record_type, data):
+    """Send a non-terminal record; serialization errors surface in the tool."""
+    _write({"type": record_type, "data": data})
+
+
+def _read_bytecode(path, source):
+    """Load the code object from a ``.pyc`` of ``source`` by this interpreter.
+
+    ``None`` if there is no such file, e.g. when the tool was edited after
+    the ``.pyc`` was written.
+    """
+    if not path or source is None:
+        return None
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if data[:4] != importlib.util.MAGIC_NUMBER:
+        return None
+    if data[8:16] != importlib.util.source_hash(source.encode("utf-8")):
+        return None
+    return marshal.loads(data[16:])
+
+
+def _source_filename(request):
+    """The tool's file name for tracebacks: the source next to its ``.pyc``."""
+    bytecode = request.get("bytecode")
+    return os.path.splitext(bytecode)[0] + ".py" if bytecode else "<tool>"
+
+
+def _load_code(request):
+    key = request.get("hash")
+    code = _CODE_CACHE.get(key) if key else None
+    if code is None:
+        if "code" not in request and not request.get("bytecode"):
+            raise LookupError(f"Tool code {key} is not loaded in this worker.")
+        try:
+            code = _read_bytecode(request.get("bytecode"), request.get("code"))
+            if code is None:
+                code = compile(request["code"], _source_filename(request), "exec")
+        except SyntaxError as e:
+            # Cached too, so every input of a batch reports the real error.
+            code = e
+        if key:
+            if len(_CODE_CACHE) >= _CODE_CACHE_SIZE:
+                _CODE_CACHE.pop(next(iter(_CODE_CACHE)))
+            _CODE_CACHE[key] = code
+    if isinstance(code, SyntaxError):
+        raise code.with_traceback(None)
+    return code
+
+
+def _defines_execute(code):
+    """Whether the module defines a top-level ``execute`` function."""
+    return any(
+        isinstance(const, types.CodeType) and const.co_name == "execute"
+        for const in code.co_consts
+    )
+
+
+def _run_tool(request, captured):
+    """Execute the tool and return the terminal record for the call.
+
+    The module body runs exactly once, with the parameters on stdin as in a
+    one-shot subprocess. Legacy tools that only implement a ``__main__``
+    block reading stdin run as ``__main__``.
+    """
+    code = _load_code(request)
+    params = request.get("params", {})
+    sys.stdin = io.StringIO(json.dumps(params))
+    legacy = not _defines_execute(code)
+    namespace = {
+        "__name__": "__main__" if legacy else "__alita_tool__",
+        "__builtins__": __builtins__,
+        "report_progress": lambda data: _emit("progress", data),
+    }
+    exec(code, namespace)
+    execute = namespace.get("execute")
+    if not legacy and callable(execute):
+        value = execute(params)
+        if inspect.isgenerator(value):
+            generator = value
+            while True:
+                try:
+                    item = next(generator)
+                except StopIteration as stop:
+                    value = stop.value
+                    break
+                _emit("partial", item)
+        return {"type": "result", "data": value}
+    return {"type": "stdout", "stdout": captured.getvalue()}
+
+
+def _usage_since(before):
+    """CPU time used since ``before``.
+
+    Peak RSS is left out: the worker's is a high-water mark over every call
+    it has served, so it can't be attributed to this one.
+    """
+    if resource is None:
+        return None
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        "user_time": after.ru_utime - before.ru_utime,
+        "sys_time": after.ru_stime - before.ru_stime,
+        "max_rss": None,
+    }
+
+
+def _handle(request):
+    before = resource.getrusage(resource.RUSAGE_SELF) if resource else None
+    captured = io.StringIO()
+    sys.stdout = captured
+    sys.stderr = captured
+    try:
+        response = _run_tool(request, captured)
+    except SystemExit:
+        response = {"type": "stdout", "stdout": captured.getvalue()}
+    except BaseException:
+        response = {"type": "error", "error": traceback.format_exc()}
+    finally:
+        sys.stdin = io.StringIO()
+        sys.stdout = sys.__stdout__
+        sys.stderr = sys.__stderr__
+    response["usage"] = _usage_since(before)
+    return response
+
+
+def main():
+    _preload(sys.argv[1].split(",") if len(sys.argv) > 1 else [])
+    for line in sys.__stdin__:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            response = {"type": "error", "error": f"Malformed request: {e}"}
+        else:
+            response = _handle(request)
+        try:
+            _write(response)
+        except (TypeError, ValueError) as e:
+            _write(
+                {"type": "error", "error": f"Tool result is not JSON serializable: {e}"}
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Content-addressed store for tool scripts executed by the sandbox."""
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from .helpers import content_hash
+from .logging import setup_logging
+
+
+class ScriptStore:
+    """Materializes each distinct script once under a name derived from its hash.
+
+    Repeated executions of the same code reuse the existing file, and parallel
+    executions never share a mutable path. Entries are evicted in LRU order once
+    ``max_entries`` is exceeded, and files older than ``max_age`` seconds left
+    behind by earlier runs are pruned at startup. Scripts that are in use are
+    pinned and never evicted. Other stores may share ``root`` and delete files
+    behind this one's back, so a remembered script that has gone missing is
+    written again.
+    """
+
+    def __init__(
+        self, root: Path, max_entries: int = 256, max_age: Optional[float] = None
+    ):
+        self.logger = setup_logging("ScriptStore")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries: "OrderedDict[str, Path]" = OrderedDict()
+        self._pins: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._prune_stale()
+
+    @contextmanager
+    def materialize(self, code: str) -> Iterator[Path]:
+        """Yield the path of a file holding ``code``, pinned for the duration."""
+        digest = content_hash(code)
+        with self._lock:
+            path = self._entries.get(digest)
+            if path is not None:
+                self._entries.move_to_end(digest)
+            self._pins[digest] = self._pins.get(digest, 0) + 1
+        try:
+            if path is None or not path.exists():
+                path = self._write(digest, code)
+                with self._lock:
+                    self._entries[digest] = path
+                    self._evict()
+            yield path
+        finally:
+            with self._lock:
+                self._pins[digest] -= 1
+                if not self._pins[digest]:
+                    del self._pins[digest]
+
+    def _write(self, digest: str, code: str) -> Path:
+        path = self.root / f"{digest}.py"
+        if self._holds(path, digest):
+            # Written by an earlier run or another process; adopt it.
+            os.utime(path)
+            return path
+        tmp_path = self.root / f".{digest}.{uuid.uuid4().hex}.tmp"
+        tmp_path.write_bytes(code.encode("utf-8"))
+        os.replace(tmp_path, path)
+        self.logger.debug(f"Materialized script {path.name}")
+        return path
+
+    @staticmethod
+    def _holds(path: Path, digest: str) -> bool:
+        """Whether ``path`` exists and its content still hashes to ``digest``."""
+        try:
+            return hashlib.sha256(path.read_bytes()).hexdigest() == digest
+        except FileNotFoundError:
+            return False
+
+    def _evict(self) -> None:
+        for digest in list(self._entries):
+            if len(self._entries) <= self.max_entries:
+                break
+            if digest in self._pins:
+                continue
+            path = self._entries.pop(digest)
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _prune_stale(self) -> None:
+        if self.max_age is None:
+            return
+        cutoff = time.time() - self.max_age
+        for path in self.root.glob("*.py"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
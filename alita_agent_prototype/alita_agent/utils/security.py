@@ -4,20 +4,65 @@ WARNING: This is a simplified prototype. A production system requires a robust
 containerization solution like Docker with strict resource and network limits.
 """
 
+import asyncio
+import os
 import subprocess
 import sys
 import json
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import aclosing, nullcontext
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import (
+    Dict,
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 from pydantic import BaseModel
 from ..config.settings import AlitaConfig
+from ..exceptions import SandboxError
 from ..utils.logging import setup_logging
+from .bytecode import is_fresh
+from .helpers import content_hash
+from .docker_pool import USAGE_MARKER, DockerContainerPool, script_command
+from .sandbox_pool import WORKER_SCRIPT, SandboxWorker, WorkerPool, worker_command
+from .script_store import ScriptStore
+from .tool_stats import ResourceUsage
+from .tool_stream import StreamDecoder, ToolStreamRecord
 
 
 class ToolExecutionResult(BaseModel):
     success: bool
     result: Any = None
     error: Optional[str] = None
+    # Resource accounting, see ResourceUsage for units.
+    wall_time: Optional[float] = None
+    user_time: Optional[float] = None
+    sys_time: Optional[float] = None
+    max_rss: Optional[int] = None
+    output_bytes: Optional[int] = None
+    # Served from the result cache instead of the sandbox.
+    cached: bool = False
+
+    @property
+    def usage(self) -> Optional[ResourceUsage]:
+        if self.wall_time is None:
+            return None
+        return ResourceUsage(
+            wall_time=self.wall_time,
+            user_time=self.user_time,
+            sys_time=self.sys_time,
+            max_rss=self.max_rss,
+            output_bytes=self.output_bytes or 0,
+        )
 
 
 class SandboxExecutor:
@@ -31,82 +76,437 @@ class SandboxExecutor:
         self.logger.debug(
             f"SandboxExecutor using python executable: {self.python_executable}"
         )
+        self.worker_pool: Optional[WorkerPool] = None
+        if self.config.mcp.get("worker_pool_size", 0) > 0:
+            self.worker_pool = WorkerPool(
+                self.python_executable,
+                size=self.config.mcp["worker_pool_size"],
+                max_calls=self.config.mcp.get("worker_max_calls", 100),
+                preload=self.config.mcp.get("worker_preload", []),
+            )
+        self.script_store = ScriptStore(
+            self.config.get_workspace_path("temp_exec"),
+            max_entries=self.config.mcp.get("script_cache_size", 256),
+            max_age=self.config.mcp.get("script_cache_max_age"),
+        )
+        self.docker_pool: Optional[DockerContainerPool] = None
+        if self.config.security.get("docker_pool_size", 0) > 0:
+            self.docker_pool = DockerContainerPool(
+                self.script_store.root,
+                image=self.config.security.get("docker_image", "python:3.10-slim"),
+                size=self.config.security["docker_pool_size"],
+                max_runs=self.config.security.get("docker_max_runs", 50),
+                memory=self.config.security.get("docker_memory", "512m"),
+                pids_limit=self.config.security.get("docker_pids_limit", 64),
+            )
+        self._docker_probe: Optional[Tuple[bool, float]] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._validation_cache: "OrderedDict[Tuple[str, Tuple[str, ...]], bool]" = (
+            OrderedDict()
+        )
 
     async def execute_code(
-        self, code: str, parameters: Dict[str, Any]
+        self,
+        code: str,
+        parameters: Dict[str, Any],
+        bytecode_path: Optional[Path] = None,
     ) -> ToolExecutionResult:
-        """Runs code in a Docker container if available, otherwise subprocess."""
-        self.logger.info("Executing code in sandbox...")
+        """Runs code in a Docker container if available, otherwise subprocess.
 
-        # Use a temporary file to run the script
-        temp_dir = self.config.get_workspace_path("temp_exec")
-        script_path = temp_dir / "temp_tool.py"
-        script_path.write_text(code)
-        self.logger.debug(f"Writing tool code to: {script_path}")
+        At most ``mcp.max_concurrent_executions`` sandboxes run at once; the
+        rest wait without blocking the event loop. When a tool streams partial
+        results and returns no final value, the partials become the result.
+        ``bytecode_path`` may name a ``.pyc`` compiled from ``code`` so local
+        interpreters can skip compiling the source; it is ignored if its
+        source hash doesn't match ``code``.
+        """
+        partials: List[Any] = []
+        stream = self.execute_code_stream(code, parameters, bytecode_path)
+        async with aclosing(stream) as records:
+            async for record in records:
+                if record.type == "partial":
+                    partials.append(record.data)
+                elif record.terminal:
+                    return self._to_result(record, partials)
+        return ToolExecutionResult(
+            success=False, result=None, error="Tool produced no result."
+        )
 
-        input_json = json.dumps(parameters)
-        self.logger.debug(f"Input JSON: {input_json}")
+    @staticmethod
+    def _to_result(
+        record: ToolStreamRecord, partials: List[Any]
+    ) -> ToolExecutionResult:
+        """Build the result of a call from its terminal record."""
+        usage = record.usage.model_dump() if record.usage else {}
+        if record.type == "result":
+            result = record.data
+            if result is None and partials:
+                result = partials
+            return ToolExecutionResult(success=True, result=result, error=None, **usage)
+        return ToolExecutionResult(
+            success=False, result=None, error=record.error, **usage
+        )
 
-        try:
-            if (
+    async def execute_code_batch(
+        self,
+        code: str,
+        params_list: List[Dict[str, Any]],
+        bytecode_path: Optional[Path] = None,
+    ) -> List[ToolExecutionResult]:
+        """Run ``code`` once per parameter dict inside a single sandbox worker.
+
+        Inputs are streamed to the worker while results are read back, so the
+        batch pays for process (or container exec) startup once rather than
+        per item. Items are isolated: an exception fails only its own item, and
+        an item that times out or crashes the worker fails alone while the
+        remaining items continue in a fresh worker. Results keep input order.
+        """
+        results: List[Optional[ToolExecutionResult]] = [None] * len(params_list)
+        if not params_list:
+            return []
+        async with self._concurrency_limit():
+            self.logger.info(f"Executing batch of {len(params_list)} in sandbox...")
+            use_docker = (
                 self.config.security.get("use_docker", True)
-                and self._docker_available()
-            ):
-                stdout, stderr, returncode = self._execute_with_docker(
-                    script_path, input_json
-                )
+                and await self._docker_available()
+            )
+            if use_docker:
+                # Docker runs the worker script from the mounted script store.
+                materialized = self.script_store.materialize(WORKER_SCRIPT.read_text())
             else:
-                stdout, stderr, returncode = self._execute_subprocess(
-                    script_path, input_json
+                materialized = nullcontext()
+            with materialized as worker_script:
+                start = 0
+                while start < len(params_list):
+                    start = await self._run_batch(
+                        code, params_list, start, results, bytecode_path, worker_script
+                    )
+        return results
+
+    async def _run_batch(
+        self,
+        code: str,
+        params_list: List[Dict[str, Any]],
+        start: int,
+        results: List[Optional[ToolExecutionResult]],
+        bytecode_path: Optional[Path],
+        worker_script: Optional[Path],
+    ) -> int:
+        """Feed items from ``start`` on to one worker; return the next index."""
+        loop = asyncio.get_running_loop()
+        key = content_hash(code)
+        try:
+            worker, finish = await loop.run_in_executor(
+                None, self._open_batch_worker, key, worker_script
+            )
+        except (SandboxError, OSError) as e:
+            self.logger.error(f"Could not start sandbox worker: {e}")
+            for index in range(start, len(results)):
+                results[index] = ToolExecutionResult(success=False, error=str(e))
+            return len(results)
+
+        requests = [{"hash": key, "params": params} for params in params_list[start:]]
+        # The worker caches the code by hash, so only the first input carries it.
+        requests[0]["code"] = code
+        if bytecode_path and worker_script is None:
+            requests[0]["bytecode"] = str(bytecode_path)
+        loop.run_in_executor(None, self._send_requests, worker, requests)
+
+        timeout = self.config.mcp["execution_timeout"]
+        index = start
+        partials: List[Any] = []
+        healthy = False
+
+        def start_item() -> None:
+            nonlocal started, deadline, output_bytes
+            started = time.perf_counter()
+            deadline = loop.time() + timeout
+            output_bytes = 0
+            partials.clear()
+
+        def usage(reported: Optional[Dict[str, Any]] = None) -> ResourceUsage:
+            return ResourceUsage(
+                wall_time=time.perf_counter() - started,
+                output_bytes=output_bytes,
+                **(reported or {}),
+            )
+
+        started = deadline = 0.0
+        output_bytes = 0
+        start_item()
+        try:
+            while index < len(results):
+                line = await asyncio.wait_for(
+                    loop.run_in_executor(None, worker.read_line),
+                    timeout=max(deadline - loop.time(), 0),
                 )
-            self.logger.debug(f"Sandbox returncode: {returncode}")
-            self.logger.debug(f"Sandbox stdout: '{stdout}'")
-            self.logger.debug(f"Sandbox stderr: '{stderr}'")
-            self.logger.debug(f"Input JSON was: '{input_json}'")
+                output_bytes += len(line)
+                record = json.loads(line)
+                for frame in self._worker_frames(record):
+                    if frame.type == "partial":
+                        partials.append(frame.data)
+                    if frame.terminal:
+                        frame.usage = usage(record.get("usage"))
+                        results[index] = self._to_result(frame, partials)
+                        index += 1
+                        start_item()
+            healthy = True
+        except asyncio.TimeoutError:
+            results[index] = ToolExecutionResult(
+                success=False, error="Execution timed out.", **usage().model_dump()
+            )
+            index += 1
+        except (SandboxError, json.JSONDecodeError) as e:
+            self.logger.error(f"Sandbox worker failed: {e}")
+            results[index] = ToolExecutionResult(
+                success=False, error=str(e), **usage().model_dump()
+            )
+            index += 1
+        finally:
+            if not healthy:
+                # Also unblocks the request writer.
+                worker.kill()
+            loop.run_in_executor(None, finish, healthy)
+        return index
+
+    def _open_batch_worker(
+        self, key: str, worker_script: Optional[Path]
+    ) -> Tuple[SandboxWorker, Callable[[bool], None]]:
+        """Start or borrow a worker for a batch of the tool hashed as ``key``.
+
+        Returns the worker and the callback that hands it back afterwards,
+        which is told whether the worker is still healthy. ``worker_script`` is
+        the worker materialized in the script store when running in docker.
+        """
+        preload = self.config.mcp.get("worker_preload", [])
+        if worker_script is None and self.worker_pool:
+            worker = self.worker_pool.acquire(key)
 
-            if returncode != 0:
-                return ToolExecutionResult(success=False, result=None, error=stderr)
+            def finish(healthy: bool) -> None:
+                if healthy:
+                    self.worker_pool.release(worker)
+                else:
+                    self.worker_pool.discard(worker)
 
+            return worker, finish
+        if worker_script is None:
+            worker = SandboxWorker(worker_command(self.python_executable, preload))
+            return worker, lambda healthy: worker.close()
+
+        in_container = ["python", f"/app/{worker_script.name}", ",".join(preload)]
+        if self.docker_pool:
+            container = self.docker_pool.acquire()
             try:
-                parsed = json.loads(stdout)
-                return ToolExecutionResult(success=True, result=parsed, error=None)
-            except json.JSONDecodeError:
-                self.logger.debug("Full stdout is not valid JSON, trying line-by-line.")
-            result_lines = stdout.strip().split("\n")
-            self.logger.debug(f"Result lines: {result_lines}")
-            for idx, line in enumerate(result_lines):
-                try:
-                    parsed = json.loads(line)
-                    self.logger.debug(
-                        f"Successfully parsed JSON from line {idx}: {parsed}"
-                    )
-                    return ToolExecutionResult(success=True, result=parsed, error=None)
-                except json.JSONDecodeError:
-                    self.logger.debug(f"Line {idx} is not valid JSON: {line}")
-            return ToolExecutionResult(
-                success=False,
-                result=None,
-                error="Failed to decode tool output as JSON. Full stdout: " + stdout,
+                worker = SandboxWorker(container.exec(in_container))
+            except OSError:
+                self.docker_pool.discard(container)
+                raise
+
+            def finish(healthy: bool) -> None:
+                worker.close()
+                if healthy:
+                    self.docker_pool.release(container)
+                else:
+                    self.docker_pool.discard(container)
+
+            return worker, finish
+        container_name = f"alita-sandbox-{uuid.uuid4().hex[:12]}"
+        worker = SandboxWorker(
+            self._docker_run_command(container_name, worker_script.parent, in_container)
+        )
+
+        def finish(healthy: bool) -> None:
+            worker.close()
+            if not healthy:
+                self._kill_container(container_name)
+
+        return worker, finish
+
+    @staticmethod
+    def _send_requests(worker: SandboxWorker, requests: List[Dict[str, Any]]) -> None:
+        try:
+            for request in requests:
+                worker.send(request)
+        except SandboxError:
+            # The reader notices the dead worker and reports it per item.
+            pass
+
+    async def execute_code_stream(
+        self,
+        code: str,
+        parameters: Dict[str, Any],
+        bytecode_path: Optional[Path] = None,
+    ) -> AsyncIterator[ToolStreamRecord]:
+        """Run code and yield its NDJSON records as they arrive.
+
+        ``progress`` and ``partial`` records are yielded as soon as the tool
+        emits them. The stream always ends with exactly one ``result`` or
+        ``error`` record, which carries the execution's resource usage.
+        Closing the stream early stops the tool.
+        """
+        async with self._concurrency_limit():
+            self.logger.info("Executing code in sandbox...")
+            use_docker = (
+                self.config.security.get("use_docker", True)
+                and await self._docker_available()
             )
+            if self.worker_pool and not use_docker:
+                stream = self._stream_from_pool(code, parameters, bytecode_path)
+            elif (
+                bytecode_path
+                and not use_docker
+                and is_fresh(bytecode_path, code.encode("utf-8"))
+            ):
+                stream = self._stream_subprocess(bytecode_path, json.dumps(parameters))
+            else:
+                stream = self._stream_from_script(code, parameters, use_docker)
+            async with aclosing(stream) as records:
+                async for record in records:
+                    yield record
 
-        except subprocess.TimeoutExpired:
-            return ToolExecutionResult(
-                success=False, result=None, error="Execution timed out."
+    def _concurrency_limit(self) -> asyncio.Semaphore:
+        """Return the semaphore bounding concurrent executions on this loop."""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(
+                self.config.mcp.get("max_concurrent_executions", 4)
             )
-        except json.JSONDecodeError:
-            return ToolExecutionResult(
-                success=False,
-                result=None,
-                error="Failed to decode tool output as JSON.",
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _stream_from_pool(
+        self,
+        code: str,
+        parameters: Dict[str, Any],
+        bytecode_path: Optional[Path] = None,
+    ) -> AsyncIterator[ToolStreamRecord]:
+        """Dispatch the call to a warm worker process."""
+        key = content_hash(code)
+        loop = asyncio.get_running_loop()
+        try:
+            # May start a new worker process.
+            worker = await loop.run_in_executor(None, self.worker_pool.acquire, key)
+        except (SandboxError, OSError) as e:
+            self.logger.error(f"Could not start sandbox worker: {e}")
+            yield ToolStreamRecord(type="error", error=str(e))
+            return
+        started = time.perf_counter()
+        deadline = loop.time() + self.config.mcp["execution_timeout"]
+        output_bytes = 0
+        healthy = False
+
+        def usage(reported: Optional[Dict[str, Any]] = None) -> ResourceUsage:
+            return ResourceUsage(
+                wall_time=time.perf_counter() - started,
+                output_bytes=output_bytes,
+                **(reported or {}),
             )
-        except Exception as e:
-            self.logger.error(
-                f"An unexpected error occurred during sandbox execution: {e}"
+
+        try:
+            request = {
+                "code": code,
+                "hash": key,
+                "bytecode": str(bytecode_path) if bytecode_path else None,
+                "params": parameters,
+            }
+            await loop.run_in_executor(None, worker.send, request)
+            while True:
+                line = await asyncio.wait_for(
+                    loop.run_in_executor(None, worker.read_line),
+                    timeout=max(deadline - loop.time(), 0),
+                )
+                output_bytes += len(line)
+                record = json.loads(line)
+                for frame in self._worker_frames(record):
+                    if frame.terminal:
+                        healthy = True
+                        frame.usage = usage(record.get("usage"))
+                    yield frame
+                    if frame.terminal:
+                        return
+        except asyncio.TimeoutError:
+            yield ToolStreamRecord(
+                type="error", error="Execution timed out.", usage=usage()
             )
-            return ToolExecutionResult(success=False, result=None, error=str(e))
+        except (SandboxError, json.JSONDecodeError) as e:
+            self.logger.error(f"Sandbox worker failed: {e}")
+            yield ToolStreamRecord(type="error", error=str(e), usage=usage())
+        finally:
+            if healthy:
+                self.worker_pool.release(worker)
+            else:
+                self.worker_pool.discard(worker)
+
+    @staticmethod
+    def _worker_frames(record: Dict[str, Any]) -> Iterator[ToolStreamRecord]:
+        """Convert one worker response into stream records."""
+        if record.get("type") == "stdout":
+            # The tool has no execute() and printed its output instead.
+            decoder = StreamDecoder()
+            for line in record.get("stdout", "").splitlines(keepends=True):
+                yield from decoder.feed(line)
+            yield decoder.finish()
+            return
+        yield ToolStreamRecord(
+            type=record.get("type", "error"),
+            data=record.get("data"),
+            error=record.get("error"),
+        )
+
+    async def _stream_from_script(
+        self, code: str, parameters: Dict[str, Any], use_docker: bool
+    ) -> AsyncIterator[ToolStreamRecord]:
+        """Run a materialized script once and decode its output."""
+        input_json = json.dumps(parameters)
+        self.logger.debug(f"Input JSON: {input_json}")
+        with self.script_store.materialize(code) as script_path:
+            self.logger.debug(f"Running tool script: {script_path}")
+            if use_docker and self.docker_pool:
+                stream = self._stream_in_container(script_path, input_json)
+            elif use_docker:
+                stream = self._stream_with_docker(script_path, input_json)
+            else:
+                stream = self._stream_subprocess(script_path, input_json)
+            async with aclosing(stream) as records:
+                async for record in records:
+                    yield record
+
+    async def warm_up(self) -> None:
+        """Pre-start the sandbox pools so the first tool call skips startup."""
+        loop = asyncio.get_running_loop()
+        if self.docker_pool and await self._docker_available():
+            await loop.run_in_executor(None, self.docker_pool.start)
+        elif self.worker_pool:
+            await loop.run_in_executor(None, self.worker_pool.start)
+
+    def close(self) -> None:
+        """Shut down any warm worker processes and sandbox containers."""
+        if self.worker_pool:
+            self.worker_pool.close()
+        if self.docker_pool:
+            self.docker_pool.close()
 
     async def validate_code(self, code: str) -> bool:
-        """Perform a basic static analysis on the generated code."""
+        """Perform a basic static analysis on the generated code.
+
+        Verdicts are cached by (code hash, allowed imports).
+        """
+        allowed_imports = tuple(sorted(self.config.security.get("allowed_imports", [])))
+        key = (content_hash(code), allowed_imports)
+        cached = self._validation_cache.get(key)
+        if cached is not None:
+            self._validation_cache.move_to_end(key)
+            return cached
+        verdict = self._check_code(code, set(allowed_imports))
+        self._validation_cache[key] = verdict
+        if len(self._validation_cache) > self.config.security.get(
+            "validation_cache_size", 1024
+        ):
+            self._validation_cache.popitem(last=False)
+        return verdict
+
+    def _check_code(self, code: str, allowed: Set[str]) -> bool:
         try:
             import ast
 
@@ -114,7 +514,6 @@ class SandboxExecutor:
         except SyntaxError:
             return False
 
-        allowed = set(self.config.security.get("allowed_imports", []))
         for node in ast.walk(tree):
             if isinstance(node, (ast.Import, ast.ImportFrom)):
                 for alias in node.names:
@@ -124,58 +523,241 @@ class SandboxExecutor:
                         return False
         return True
 
-    def _docker_available(self) -> bool:
-        """Check if the docker CLI is available."""
+    async def _docker_available(self) -> bool:
+        """Check if the docker CLI is available.
+
+        The probe result is cached for ``security.docker_probe_ttl`` seconds.
+        """
+        ttl = self.config.security.get("docker_probe_ttl", 300)
+        if self._docker_probe and time.monotonic() - self._docker_probe[1] < ttl:
+            return self._docker_probe[0]
+        loop = asyncio.get_running_loop()
         try:
-            subprocess.run(
-                ["docker", "--version"],
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+            await loop.run_in_executor(
+                None,
+                lambda: subprocess.run(
+                    ["docker", "--version"],
+                    check=True,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                ),
             )
-            return True
+            available = True
         except Exception:
-            return False
+            available = False
+        self._docker_probe = (available, time.monotonic())
+        return available
+
+    async def _stream_process(
+        self,
+        cmd: List[str],
+        input_json: str,
+        on_abort: Optional[Callable[[], None]] = None,
+        usage_on_stderr: bool = False,
+    ) -> AsyncIterator[ToolStreamRecord]:
+        """Run ``cmd`` and decode its stdout without blocking the event loop.
+
+        Blocking pipe I/O happens on the default executor and stderr is spooled
+        to a temporary file. If the timeout expires or the consumer stops early
+        (including task cancellation) the child is killed and ``on_abort`` runs.
+
+        Resource usage is collected with ``wait4``, or when ``usage_on_stderr``
+        is set, from the report written by the docker usage bootstrap.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        deadline = loop.time() + self.config.mcp["execution_timeout"]
+        output_bytes = 0
+        rusage = None
+        with tempfile.TemporaryFile(mode="w+") as stderr_file:
+            try:
+                process = subprocess.Popen(
+                    cmd,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=stderr_file,
+                    text=True,
+                )
+            except OSError as e:
+                yield ToolStreamRecord(type="error", error=str(e))
+                return
+            writer = loop.run_in_executor(None, self._feed_stdin, process, input_json)
+            decoder = StreamDecoder()
+            finished = timed_out = False
+            try:
+                while True:
+                    line = await asyncio.wait_for(
+                        loop.run_in_executor(None, process.stdout.readline),
+                        timeout=max(deadline - loop.time(), 0),
+                    )
+                    if not line:
+                        break
+                    output_bytes += len(line)
+                    for record in decoder.feed(line):
+                        yield record
+                returncode, rusage = await asyncio.wait_for(
+                    loop.run_in_executor(None, self._wait_with_rusage, process),
+                    timeout=max(deadline - loop.time(), 0),
+                )
+                await writer
+                finished = True
+            except asyncio.TimeoutError:
+                timed_out = True
+            finally:
+                if not finished:
+                    process.kill()
+                    loop.run_in_executor(None, process.wait)
+                    if on_abort:
+                        on_abort()
+            wall_time = time.perf_counter() - started
+            if timed_out:
+                yield ToolStreamRecord(
+                    type="error",
+                    error="Execution timed out.",
+                    usage=ResourceUsage(wall_time=wall_time, output_bytes=output_bytes),
+                )
+                return
 
-    def _execute_with_docker(self, script_path: Path, input_json: str):
+            process.stdout.close()
+            self.logger.debug(f"Sandbox returncode: {returncode}")
+            stderr = None
+            if rusage is not None:
+                usage = ResourceUsage.from_rusage(rusage, wall_time, output_bytes)
+            else:
+                usage = ResourceUsage(wall_time=wall_time, output_bytes=output_bytes)
+            if usage_on_stderr or returncode != 0:
+                stderr_file.seek(0)
+                stderr = self._extract_usage_report(stderr_file.read(), usage)
+            final = (
+                ToolStreamRecord(type="error", error=stderr)
+                if returncode != 0
+                else decoder.finish()
+            )
+            final.usage = usage
+            yield final
+
+    @staticmethod
+    def _wait_with_rusage(process: subprocess.Popen):
+        """Reap ``process`` and return its exit code and resource usage."""
+        if not hasattr(os, "wait4"):  # pragma: no cover - Windows
+            return process.wait(), None
+        try:
+            _, status, rusage = os.wait4(process.pid, 0)
+        except ChildProcessError:
+            # Already reaped elsewhere; the exit code is still available.
+            return process.wait(), None
+        process.returncode = os.waitstatus_to_exitcode(status)
+        return process.returncode, rusage
+
+    @staticmethod
+    def _extract_usage_report(stderr: str, usage: ResourceUsage) -> str:
+        """Apply and strip a usage report written by the docker bootstrap."""
+        head, marker, report = stderr.rpartition(USAGE_MARKER)
+        if not marker:
+            return stderr
+        try:
+            reported = json.loads(report)
+        except json.JSONDecodeError:
+            return stderr
+        usage.user_time = reported.get("user_time")
+        usage.sys_time = reported.get("sys_time")
+        usage.max_rss = reported.get("max_rss")
+        return head.rstrip("\n")
+
+    @staticmethod
+    def _feed_stdin(process: subprocess.Popen, input_json: str) -> None:
+        try:
+            process.stdin.write(input_json)
+            process.stdin.close()
+        except (BrokenPipeError, OSError, ValueError):
+            pass
+
+    async def _stream_in_container(
+        self, script_path: Path, input_json: str
+    ) -> AsyncIterator[ToolStreamRecord]:
+        """Run the code inside a warm container from the docker pool."""
+        loop = asyncio.get_running_loop()
+        try:
+            container = await loop.run_in_executor(None, self.docker_pool.acquire)
+        except SandboxError as e:
+            yield ToolStreamRecord(type="error", error=str(e))
+            return
+        aborted = False
+
+        def discard() -> None:
+            # The tool may still be running inside the container.
+            nonlocal aborted
+            aborted = True
+            loop.run_in_executor(None, self.docker_pool.discard, container)
+
+        try:
+            stream = self._stream_process(
+                container.exec_command(script_path.name),
+                input_json,
+                discard,
+                usage_on_stderr=True,
+            )
+            async with aclosing(stream) as records:
+                async for record in records:
+                    yield record
+        finally:
+            if not aborted:
+                loop.run_in_executor(None, self.docker_pool.release, container)
+
+    async def _stream_with_docker(
+        self, script_path: Path, input_json: str
+    ) -> AsyncIterator[ToolStreamRecord]:
         """Run the code inside a Docker container."""
-        cmd = [
+        container_name = f"alita-sandbox-{uuid.uuid4().hex[:12]}"
+        cmd = self._docker_run_command(
+            container_name, script_path.parent, script_command(script_path.name)
+        )
+
+        def kill_container() -> None:
+            self._kill_container(container_name)
+
+        async with aclosing(
+            self._stream_process(cmd, input_json, kill_container, usage_on_stderr=True)
+        ) as records:
+            async for record in records:
+                yield record
+
+    def _docker_run_command(
+        self, container_name: str, mount_dir: Path, command: List[str]
+    ) -> List[str]:
+        """``docker run`` invocation of ``command`` in a one-off container."""
+        return [
             "docker",
             "run",
             "--rm",
             "-i",
+            "--name",
+            container_name,
             "--network",
             "none",
             "-v",
-            f"{script_path.parent}:/app",
+            f"{mount_dir}:/app:ro",
             "-w",
             "/app",
-            "python:3.10-slim",
-            "python",
-            str(script_path.name),
+            self.config.security.get("docker_image", "python:3.10-slim"),
+            *command,
         ]
-        process = subprocess.Popen(
-            cmd,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-        )
-        stdout, stderr = process.communicate(
-            input=input_json, timeout=self.config.mcp["execution_timeout"]
+
+    @staticmethod
+    def _kill_container(container_name: str) -> None:
+        # Killing the docker CLI does not stop the container itself.
+        subprocess.Popen(
+            ["docker", "kill", container_name],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
         )
-        return stdout, stderr, process.returncode
 
-    def _execute_subprocess(self, script_path: Path, input_json: str):
+    async def _stream_subprocess(
+        self, script_path: Path, input_json: str
+    ) -> AsyncIterator[ToolStreamRecord]:
         """Run the code in a local subprocess (fallback)."""
-        process = subprocess.Popen(
-            [self.python_executable, str(script_path)],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-        )
-        stdout, stderr = process.communicate(
-            input=input_json, timeout=self.config.mcp["execution_timeout"]
-        )
-        return stdout, stderr, process.returncode
+        async with aclosing(
+            self._stream_process([self.python_executable, str(script_path)], input_json)
+        ) as records:
+            async for record in records:
+                yield record
@@ -0,0 +1,96 @@
+"""Resource accounting for sandboxed tool executions."""
+
+import threading
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class ResourceUsage(BaseModel):
+    """Resources consumed by a single tool execution.
+
+    ``max_rss`` is reported as the operating system does (KiB on Linux). CPU
+    times and RSS are ``None`` when the execution path cannot observe them;
+    RSS always is for runs in a pooled worker, which serves many calls.
+    """
+
+    wall_time: float = 0.0
+    user_time: Optional[float] = None
+    sys_time: Optional[float] = None
+    max_rss: Optional[int] = None
+    output_bytes: int = 0
+
+    @classmethod
+    def from_rusage(
+        cls, rusage, wall_time: float, output_bytes: int
+    ) -> "ResourceUsage":
+        return cls(
+            wall_time=wall_time,
+            user_time=rusage.ru_utime,
+            sys_time=rusage.ru_stime,
+            max_rss=rusage.ru_maxrss,
+            output_bytes=output_bytes,
+        )
+
+
+class ToolStats(BaseModel):
+    """Aggregated resource usage of one tool."""
+
+    name: str
+    calls: int = 0
+    failures: int = 0
+    wall_time: float = 0.0
+    user_time: float = 0.0
+    sys_time: float = 0.0
+    peak_rss: int = 0
+    output_bytes: int = 0
+    # Calls answered from the result cache without running the sandbox.
+    cache_hits: int = 0
+
+    @property
+    def cpu_time(self) -> float:
+        return self.user_time + self.sys_time
+
+
+class ToolStatsStore:
+    """Thread-safe in-memory aggregate of resource usage per tool name."""
+
+    def __init__(self):
+        self._stats: Dict[str, ToolStats] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self, tool_name: str, usage: Optional[ResourceUsage], success: bool
+    ) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(tool_name, ToolStats(name=tool_name))
+            stats.calls += 1
+            if not success:
+                stats.failures += 1
+            if usage is None:
+                return
+            stats.wall_time += usage.wall_time
+            stats.user_time += usage.user_time or 0.0
+            stats.sys_time += usage.sys_time or 0.0
+            stats.peak_rss = max(stats.peak_rss, usage.max_rss or 0)
+            stats.output_bytes += usage.output_bytes
+
+    def record_cache_hit(self, tool_name: str) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(tool_name, ToolStats(name=tool_name))
+            stats.cache_hits += 1
+
+    def get(self, tool_name: str) -> Optional[ToolStats]:
+        with self._lock:
+            stats = self._stats.get(tool_name)
+            return stats.model_copy() if stats else None
+
+    def all(self) -> List[ToolStats]:
+        with self._lock:
+            return [stats.model_copy() for stats in self._stats.values()]
+
+    def top(self, metric: str = "cpu_time", limit: int = 10) -> List[ToolStats]:
+        """Return the tools consuming the most of ``metric``, highest first."""
+        return sorted(
+            self.all(), key=lambda stats: getattr(stats, metric), reverse=True
+        )[:limit]
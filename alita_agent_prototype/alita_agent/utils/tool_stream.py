@@ -0,0 +1,109 @@
+"""
+Framed NDJSON protocol spoken between tools and the sandbox executor.
+
+A tool writes one JSON object per line to stdout. Objects carrying
+``"__frame__": 1`` (:data:`FRAME_MARKER`) and a ``type`` from
+:data:`FRAME_TYPES` are protocol records:
+
+* ``{"__frame__": 1, "type": "progress", "data": ...}`` - progress update
+* ``{"__frame__": 1, "type": "partial", "data": ...}`` - a chunk of the result
+* ``{"__frame__": 1, "type": "result", "data": ...}`` - the final result
+* ``{"__frame__": 1, "type": "error", "error": "..."}`` - the tool failed
+
+The marker keeps ordinary results that happen to have a ``type`` key, such as
+``{"type": "error", "code": 404}``, from being taken for frames. Any other
+output is treated as legacy, unframed output and decoded the way the executor
+always has: as one JSON document, or failing that the first line that is valid
+JSON.
+"""
+
+import json
+from typing import Any, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+from .tool_stats import ResourceUsage
+
+FRAME_MARKER = "__frame__"
+FRAME_TYPES = ("progress", "partial", "result", "error")
+TERMINAL_TYPES = ("result", "error")
+
+
+class ToolStreamRecord(BaseModel):
+    type: str
+    data: Any = None
+    error: Optional[str] = None
+    # Attached by the executor to the terminal record.
+    usage: Optional[ResourceUsage] = None
+
+    @property
+    def terminal(self) -> bool:
+        return self.type in TERMINAL_TYPES
+
+
+class StreamDecoder:
+    """Incrementally decodes a tool's stdout into :class:`ToolStreamRecord` objects.
+
+    Progress and partial records are returned as soon as their line arrives.
+    The terminal record is held back until :meth:`finish` so the caller can
+    check the process exit status first. Only unframed output is buffered.
+    """
+
+    def __init__(self):
+        self._terminal: Optional[ToolStreamRecord] = None
+        self._unframed: List[str] = []
+
+    def feed(self, line: str) -> Iterator[ToolStreamRecord]:
+        record = self._parse_frame(line)
+        if record is None:
+            if self._terminal is None:
+                self._unframed.append(line)
+            return
+        if record.terminal:
+            if self._terminal is None:
+                self._terminal = record
+                self._unframed.clear()
+            return
+        yield record
+
+    def finish(self) -> ToolStreamRecord:
+        """Return the terminal record once the tool's output is complete."""
+        if self._terminal is not None:
+            return self._terminal
+        return decode_legacy_output("".join(self._unframed))
+
+    @staticmethod
+    def _parse_frame(line: str) -> Optional[ToolStreamRecord]:
+        stripped = line.strip()
+        if not stripped.startswith("{"):
+            return None
+        try:
+            payload = json.loads(stripped)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(payload, dict) or payload.get(FRAME_MARKER) != 1:
+            return None
+        if payload.get("type") not in FRAME_TYPES:
+            return None
+        return ToolStreamRecord(
+            type=payload["type"],
+            data=payload.get("data"),
+            error=payload.get("error"),
+        )
+
+
+def decode_legacy_output(stdout: str) -> ToolStreamRecord:
+    """Decode unframed output, accepting the first line that is valid JSON."""
+    try:
+        return ToolStreamRecord(type="result", data=json.loads(stdout))
+    except json.JSONDecodeError:
+        pass
+    for line in stdout.strip().split("\n"):
+        try:
+            return ToolStreamRecord(type="result", data=json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return ToolStreamRecord(
+        type="error",
+        error="Failed to decode tool output as JSON. Full stdout: " + stdout,
+    )
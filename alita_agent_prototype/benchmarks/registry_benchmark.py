@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Scalability benchmark for the ToolRegistry.
+
+Synthesizes N tools in a temporary tool store, then measures registry
+startup (``_load_tools``), the memory it retains, and the latency of
+``find_tool_by_description``. Results are printed (or written) as JSON so
+runs can be compared across commits:
+
+    python benchmarks/registry_benchmark.py --sizes 1000 10000 --output base.json
+
+The script also runs against trees that predate the tool store, the vector
+index or the registry's tuning options: it only passes the constructor
+arguments the registry under test accepts, and lists them in the report.
+"""
+import argparse
+import gc
+import inspect
+import json
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Add project root to the Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from alita_agent.core.tool_registry import ToolRegistry  # noqa: E402
+
+try:
+    from alita_agent.core.tool_store import FileToolStore, SQLiteToolStore
+except ImportError:  # trees where the registry reads the tools directory itself
+    FileToolStore = SQLiteToolStore = None
+try:
+    from alita_agent.core.tool_vectors import VectorIndex, vectors_available
+except ImportError:  # trees without the vector index
+    VectorIndex = None
+
+    def vectors_available() -> bool:
+        return False
+
+
+REGISTRY_PARAMETERS = set(inspect.signature(ToolRegistry).parameters)
+
+VERBS = """parse convert fetch download upload resize compress extract sort
+filter merge split validate format translate summarize count search reverse
+encode decode hash sign encrypt render plot schedule monitor""".split()
+OBJECTS = """csv json xml yaml pdf image video audio text string list table
+file url email calendar invoice report log metric graph matrix date number
+address name""".split()
+QUALIFIERS = [
+    "quickly",
+    "safely",
+    "from disk",
+    "from the web",
+    "into a database",
+    "by date",
+    "with headers",
+    "in parallel",
+    "for a user",
+    "as markdown",
+]
+
+TOOL_CODE = "def execute(params):\n    return params\n"
+
+
+def synthesize_descriptions(count: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        f"A tool that can: {rng.choice(VERBS)} {rng.choice(OBJECTS)} "
+        f"{rng.choice(OBJECTS)} {rng.choice(QUALIFIERS)}"
+        for _ in range(count)
+    ]
+
+
+def populate(tools_dir: Path, backend: str, descriptions: List[str]) -> None:
+    """Write the synthetic tools the way the given store backend keeps them."""
+    if backend == "files":
+        # Only metadata files are read on load; skip the atomic save path.
+        for i, desc in enumerate(descriptions):
+            name = f"Tool{i}"
+            (tools_dir / f"{name}.py").write_text(TOOL_CODE)
+            (tools_dir / f"{name}.meta.json").write_text(
+                json.dumps({"name": name, "description": desc, "version": 1})
+            )
+        return
+    store = open_store(tools_dir, backend)
+    for i, desc in enumerate(descriptions):
+        store.save(f"Tool{i}", TOOL_CODE, {"description": desc})
+    store.close()
+
+
+def open_store(tools_dir: Path, backend: str):
+    if backend == "files":
+        return FileToolStore(tools_dir)
+    return SQLiteToolStore(tools_dir / "tools.sqlite3")
+
+
+def make_queries(descriptions: List[str], count: int, seed: int) -> List[str]:
+    """A mix of exact descriptions, rephrasings and queries with no match."""
+    rng = random.Random(seed + 1)
+    queries = []
+    for i in range(count):
+        desc = rng.choice(descriptions)
+        if i % 3 == 0:
+            queries.append(desc)
+        elif i % 3 == 1:
+            queries.append(desc.replace("A tool that can: ", "").upper() + " please")
+        else:
+            queries.append(f"{rng.choice(VERBS)} a {rng.choice(OBJECTS)} spaceship")
+    return queries
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def registry_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """Constructor arguments for the benchmark that this ToolRegistry takes.
+
+    Values are factories, called once per registry.
+    """
+    wanted = {
+        "store": lambda tools_dir: open_store(tools_dir, args.backend),
+        # No background refreshes or cached answers while timing lookups.
+        "refresh_interval": lambda tools_dir: None,
+        "vectors": lambda tools_dir: VectorIndex() if args.vectors else None,
+        "lookup_cache_size": lambda tools_dir: 0,
+    }
+    return {name: make for name, make in wanted.items() if name in REGISTRY_PARAMETERS}
+
+
+def load_registry(tools_dir: Path, args: argparse.Namespace) -> ToolRegistry:
+    options = registry_options(args)
+    return ToolRegistry(
+        tools_dir, **{name: make(tools_dir) for name, make in options.items()}
+    )
+
+
+def close_registry(registry: ToolRegistry) -> None:
+    store = getattr(registry, "store", None)
+    if store is not None:
+        store.close()
+
+
+def run_size(count: int, args: argparse.Namespace) -> Dict[str, Any]:
+    descriptions = synthesize_descriptions(count, args.seed)
+    queries = make_queries(descriptions, args.queries, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        tools_dir = Path(tmp)
+        started = time.perf_counter()
+        populate(tools_dir, args.backend, descriptions)
+        populate_seconds = time.perf_counter() - started
+
+        # tracemalloc slows allocation down, so memory is measured on a
+        # separate load from the timed one.
+        gc.collect()
+        tracemalloc.start()
+        registry = load_registry(tools_dir, args)
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        close_registry(registry)
+        del registry
+
+        gc.collect()
+        started = time.perf_counter()
+        registry = load_registry(tools_dir, args)
+        load_seconds = time.perf_counter() - started
+
+        latencies = []
+        matched = 0
+        for query in queries:
+            started = time.perf_counter()
+            found = registry.find_tool_by_description(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+            matched += found is not None
+        close_registry(registry)
+
+    return {
+        "tools": count,
+        "backend": args.backend,
+        "vectors": bool(args.vectors),
+        "registry_options": sorted(registry_options(args)),
+        "populate_seconds": round(populate_seconds, 4),
+        "load_seconds": round(load_seconds, 4),
+        "load_memory_bytes": retained,
+        "load_peak_memory_bytes": peak,
+        "queries": len(queries),
+        "matched": matched,
+        "lookup_mean_ms": round(statistics.fmean(latencies), 4),
+        "lookup_p50_ms": round(percentile(latencies, 0.50), 4),
+        "lookup_p99_ms": round(percentile(latencies, 0.99), 4),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--backend", choices=["files", "sqlite"], default="files")
+    parser.add_argument(
+        "--vectors", action="store_true", help="also build the numpy vector index"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write JSON here instead of stdout")
+    args = parser.parse_args()
+    if args.vectors and "vectors" not in REGISTRY_PARAMETERS:
+        parser.error("--vectors needs a ToolRegistry with a vector index")
+    if args.vectors and not vectors_available():
+        parser.error("--vectors requires numpy")
+    if args.backend == "sqlite" and "store" not in REGISTRY_PARAMETERS:
+        parser.error("--backend sqlite needs a ToolRegistry with tool stores")
+
+    # Registration logs one line per tool; keep the output machine-readable.
+    logging.disable(logging.CRITICAL)
+    report = {
+        "benchmark": "tool_registry",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "results": [run_size(count, args) for count in args.sizes],
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
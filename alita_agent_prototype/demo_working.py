@@ -134,6 +134,9 @@ if __name__ == '__main__':
         for tool_file in tool_files:
             print(f"   - {tool_file.name}")
 
+    # 9. Write pending episodes and the vector index to disk
+    await manager.aclose()
+
     print("\n🎉 Demo completed successfully!")
 
 
@@ -12,9 +12,12 @@ async def main():
         "Create a tool to summarize text",
         "Create a tool to fetch data from an API",
     ]
-    for task in tasks:
-        result = await agent.process_task(task)
-        print(f"Task: {task}\nResult: {result}\n")
+    try:
+        for task in tasks:
+            result = await agent.process_task(task)
+            print(f"Task: {task}\nResult: {result}\n")
+    finally:
+        await agent.aclose()
 
 
 if __name__ == "__main__":
@@ -51,6 +51,9 @@ async def main():
 
     except Exception as e:
         print(f"\n💥 An unexpected error occurred during the demonstration: {e}")
+    finally:
+        # Writes pending episodes and the vector index to disk.
+        await manager.aclose()
 
     print(
         "🎉 Basic usage example completed. Check the 'workspace/tools' directory for any new tools created."
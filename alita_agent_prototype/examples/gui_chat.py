@@ -69,7 +69,10 @@ def main() -> None:
     agent = ManagerAgent(config)
     root = tk.Tk()
     AlitaChatGUI(root, agent)
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        asyncio.run(agent.aclose())
 
 
 if __name__ == "__main__":
@@ -58,8 +58,8 @@ if __name__ == '__main__':
     asyncio.run(run())
 
 
-def test_manager_agent_process_task_default():
-    config = AlitaConfig()
+def test_manager_agent_process_task_default(tmp_path):
+    config = AlitaConfig(workspace_dir=str(tmp_path))
     agent = ManagerAgent(config)
 
     # Mock web search to avoid network calls
@@ -105,3 +105,24 @@ if __name__ == '__main__':
         assert "success" in result["result"]["status"]
 
     asyncio.run(run())
+
+
+def test_manager_agent_reuses_fresh_results(tmp_path):
+    config = AlitaConfig(workspace_dir=str(tmp_path))
+    config.memory["reuse_results"] = True
+    manager = ManagerAgent(config)
+
+    async def must_not_run(*args, **kwargs):
+        raise AssertionError("the tool should not run again")
+
+    manager.mcp_system.execute_tool = must_not_run
+
+    async def run():
+        await manager.memory.store_episode(
+            {"query": "Echo test!", "tool": "EchoTestTool", "result": {"ok": True}}
+        )
+        result = await manager.process_task("echo  TEST")
+        assert result == {"success": True, "result": {"ok": True}, "reused": True}
+        await manager.aclose()
+
+    asyncio.run(run())
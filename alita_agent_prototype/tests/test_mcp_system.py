@@ -1,11 +1,11 @@
-def test_mcp_system_tool_creation_and_execution():
+def test_mcp_system_tool_creation_and_execution(tmp_path):
     import asyncio
     import logging
     from alita_agent.config.settings import AlitaConfig
     from alita_agent.core.web_agent import WebAgent, SearchResult
     from alita_agent.core.mcp_system import MCPSystem
 
-    config = AlitaConfig()
+    config = AlitaConfig(workspace_dir=str(tmp_path))
     web_agent = WebAgent(config)
 
     # Enable debug logging
@@ -67,3 +67,303 @@ if __name__ == '__main__':
         assert result.result["received_params"]["echo"] == "hello"
 
     asyncio.run(run())
+
+
+def test_mcp_system_execute_tool_stream(tmp_path):
+    import asyncio
+    from alita_agent.config.settings import AlitaConfig
+    from alita_agent.core.web_agent import WebAgent
+    from alita_agent.core.mcp_system import MCPSystem
+
+    config = AlitaConfig(workspace_dir=str(tmp_path))
+    config.security["use_docker"] = False
+    mcp = MCPSystem(config, WebAgent(config))
+    (mcp.tools_dir / "CountTool.py").write_text(
+        "def execute(params):\n"
+        "    for i in range(params['n']):\n"
+        "        report_progress(i)\n"
+        "    return {'count': params['n']}\n"
+    )
+
+    async def run():
+        records = [r async for r in mcp.execute_tool_stream("CountTool", {"n": 2})]
+        assert [r.type for r in records] == ["progress", "progress", "result"]
+        assert records[-1].data == {"count": 2}
+        await mcp.execute_tool("CountTool", {"n": 1})
+        stats = mcp.tool_stats.get("CountTool")
+        assert stats.calls == 2 and stats.failures == 0
+        assert stats.wall_time > 0
+
+    try:
+        asyncio.run(run())
+    finally:
+        mcp.close()
+
+
+def test_mcp_system_runs_precompiled_bytecode(tmp_path):
+    import asyncio
+    from alita_agent.config.settings import AlitaConfig
+    from alita_agent.core.web_agent import WebAgent
+    from alita_agent.core.mcp_system import MCPSystem
+    from alita_agent.utils.bytecode import compile_tool, is_fresh
+
+    template = (
+        "import json, sys\n\n"
+        "def execute(p):\n    return p['a'] + {}\n\n"
+        "if __name__ == '__main__':\n"
+        "    print(json.dumps(execute(json.loads(sys.stdin.read()))))\n"
+    )
+
+    async def run(mcp):
+        mcp._save_tool_to_disk("AddTool", template.format(1), "")
+        source_path = mcp.tools_dir / "AddTool.py"
+        pyc_path = mcp.tools_dir / "AddTool.pyc"
+        assert is_fresh(pyc_path, source_path.read_bytes())
+        assert (await mcp.execute_tool("AddTool", {"a": 1})).result == 2
+
+        # Editing the source out of band invalidates the bytecode.
+        source_path.write_text(template.format(2))
+        assert (await mcp.execute_tool("AddTool", {"a": 1})).result == 3
+        assert is_fresh(pyc_path, source_path.read_bytes())
+
+        # So does replacing the bytecode behind the source's back.
+        assert compile_tool(template.format(5).encode(), pyc_path)
+        assert (await mcp.execute_tool("AddTool", {"a": 1})).result == 3
+
+    for pool_size in (0, 1):
+        config = AlitaConfig(workspace_dir=str(tmp_path / str(pool_size)))
+        config.security["use_docker"] = False
+        config.mcp["worker_pool_size"] = pool_size
+        mcp = MCPSystem(config, WebAgent(config))
+        try:
+            asyncio.run(run(mcp))
+        finally:
+            mcp.close()
+
+
+def test_mcp_system_execute_tool_batch(tmp_path):
+    import asyncio
+    from alita_agent.config.settings import AlitaConfig
+    from alita_agent.core.web_agent import WebAgent
+    from alita_agent.core.mcp_system import MCPSystem
+
+    config = AlitaConfig(workspace_dir=str(tmp_path))
+    config.security["use_docker"] = False
+    mcp = MCPSystem(config, WebAgent(config))
+    mcp._save_tool_to_disk(
+        "UpperTool", "def execute(p):\n    return p['s'].upper()\n", ""
+    )
+
+    async def run():
+        results = await mcp.execute_tool_batch(
+            "UpperTool", [{"s": "a"}, {}, {"s": "c"}]
+        )
+        assert [r.result for r in results] == ["A", None, "C"]
+        stats = mcp.tool_stats.get("UpperTool")
+        assert stats.calls == 3 and stats.failures == 1
+
+    try:
+        asyncio.run(run())
+    finally:
+        mcp.close()
+
+
+def _cache_mcp(tmp_path, **mcp_settings):
+    from alita_agent.config.settings import AlitaConfig
+    from alita_agent.core.web_agent import WebAgent
+    from alita_agent.core.mcp_system import MCPSystem
+
+    config = AlitaConfig(workspace_dir=str(tmp_path))
+    config.security["use_docker"] = False
+    config.mcp.update(mcp_settings)
+    return MCPSystem(config, WebAgent(config))
+
+
+RANDOM_TOOL = "import random\n\ndef execute(p):\n    return [p['x'], random.random()]\n"
+
+
+def test_deterministic_tool_results_are_memoized(tmp_path):
+    import asyncio
+
+    mcp = _cache_mcp(tmp_path)
+    mcp._save_tool_to_disk("PureTool", RANDOM_TOOL, "", deterministic=True)
+    mcp._save_tool_to_disk("ImpureTool", RANDOM_TOOL, "")
+
+    async def run():
+        first = await mcp.execute_tool("PureTool", {"x": 1, "y": [2]})
+        second = await mcp.execute_tool("PureTool", {"y": [2], "x": 1})
+        assert not first.cached and second.cached
+        assert first.result == second.result
+        other = await mcp.execute_tool("PureTool", {"x": 2})
+        assert not other.cached
+
+        batch = await mcp.execute_tool_batch("PureTool", [{"x": 1, "y": [2]}, {"x": 3}])
+        assert batch[0].cached and batch[0].result == first.result
+        assert not batch[1].cached
+
+        impure = [await mcp.execute_tool("ImpureTool", {"x": 1}) for _ in range(2)]
+        assert impure[0].result != impure[1].result
+
+    try:
+        asyncio.run(run())
+    finally:
+        mcp.close()
+    stats = mcp.tool_stats.get("PureTool")
+    assert stats.calls == 3 and stats.cache_hits == 2
+    assert mcp.result_cache.hits == 2
+
+
+def test_result_cache_persists_and_expires(tmp_path):
+    import asyncio
+
+    from alita_agent.utils.result_cache import MISS, ResultCache
+
+    async def call(mcp):
+        return await mcp.execute_tool("PureTool", {"x": 1})
+
+    mcp = _cache_mcp(tmp_path, result_cache_persist=True)
+    mcp._save_tool_to_disk("PureTool", RANDOM_TOOL, "", deterministic=True)
+    try:
+        first = asyncio.run(call(mcp))
+    finally:
+        mcp.close()
+    restarted = _cache_mcp(tmp_path, result_cache_persist=True)
+    try:
+        second = asyncio.run(call(restarted))
+    finally:
+        restarted.close()
+    assert second.cached and second.result == first.result
+
+    cache = ResultCache(max_entries=1, ttl=0)
+    cache.put("a", 1)
+    assert cache.get("a") is MISS
+    cache = ResultCache(max_entries=1)
+    cache.put("a", None)
+    cache.put("b", 2)
+    assert cache.get("a") is MISS and cache.get("b") == 2
+
+
+def test_concurrent_create_tool_calls_share_one_generation(tmp_path):
+    import asyncio
+
+    first, second = _cache_mcp(tmp_path), _cache_mcp(tmp_path)
+    generated = []
+
+    async def slow_gen(name, desc, ctx):
+        generated.append(name)
+        await asyncio.sleep(0.2)
+        return "def execute(p):\n    return 'ok'\n"
+
+    async def no_search(query):
+        return None
+
+    for mcp in (first, second):
+        mcp.llm_code_generator = slow_gen
+        mcp.web_agent.search = no_search
+
+    async def run():
+        # The second MCPSystem stands in for another process sharing the tools.
+        await asyncio.gather(
+            *(first.create_tool("SharedTool", "desc") for _ in range(3)),
+            second.create_tool("SharedTool", "desc"),
+        )
+        assert generated == ["SharedTool"]
+        assert not first._creations
+        assert (await second.execute_tool("SharedTool", {})).result == "ok"
+
+    try:
+        asyncio.run(run())
+    finally:
+        first.close()
+        second.close()
+    assert not list(first.tools_dir.glob("*.tmp"))
+    assert not list(first.tools_dir.glob(".*.lock"))
+    assert [p.name for p in first.locks_dir.iterdir()] == ["SharedTool.lock"]
+
+
+def test_create_tool_commits_first_passing_candidate(tmp_path):
+    import asyncio
+
+    import pytest
+    from alita_agent.exceptions import ToolCreationError
+
+    mcp = _cache_mcp(tmp_path, creation_candidates=3)
+    candidates = [
+        (0.0, "import os\n\ndef execute(p):\n    return 'invalid'\n"),
+        (5.0, "def execute(p):\n    return 'slow'\n"),
+        (0.1, "def execute(p):\n    return p['task_query']\n"),
+    ]
+    cancelled = []
+
+    async def gen(name, desc, ctx):
+        delay, code = candidates.pop(0)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(code)
+            raise
+        return code
+
+    async def no_search(query):
+        return None
+
+    mcp.llm_code_generator = gen
+    mcp.web_agent.search = no_search
+
+    async def run():
+        await mcp.create_tool("SpecTool", "echo")
+        assert (await mcp.execute_tool("SpecTool", {"task_query": "q"})).result == "q"
+        assert cancelled == ["def execute(p):\n    return 'slow'\n"]
+
+        candidates.extend(
+            [(0.0, "def execute(:\n"), (0.0, "def execute(p):\n    1 / 0\n")]
+        )
+        mcp.config.mcp["creation_candidates"] = 2
+        with pytest.raises(ToolCreationError, match="None of the 2 candidates"):
+            await mcp.create_tool("BrokenTool", "fails")
+
+    try:
+        asyncio.run(run())
+    finally:
+        mcp.close()
+
+
+def test_trusted_tools_run_in_process(tmp_path):
+    import asyncio
+    import os
+
+    import pytest
+
+    mcp = _cache_mcp(tmp_path)
+    mcp._save_tool_to_disk(
+        "PidTool",
+        "import os\n\n"
+        "def execute(p):\n"
+        "    return {'pid': os.getpid(), 'tags': {p['t']}}\n",
+        "",
+    )
+
+    async def run():
+        sandboxed = await mcp.execute_tool("PidTool", {"t": "x"})
+        assert sandboxed.success is False  # a set can't cross the JSON boundary
+
+        mcp.set_tool_trust("PidTool", "trusted")
+        trusted = await mcp.execute_tool("PidTool", {"t": "x"})
+        assert trusted.success and trusted.result == {"pid": os.getpid(), "tags": {"x"}}
+        assert trusted.wall_time is not None
+
+        batch = await mcp.execute_tool_batch("PidTool", [{"t": "a"}, {}])
+        assert batch[0].result["tags"] == {"a"}
+        assert not batch[1].success and "KeyError" in batch[1].error
+
+        mcp.config.security["allow_trusted_tools"] = False
+        assert not (await mcp.execute_tool("PidTool", {"t": "x"})).success
+
+    try:
+        asyncio.run(run())
+    finally:
+        mcp.close()
+    assert mcp.tool_store.get_metadata("PidTool")["trust"] == "trusted"
+    assert mcp.tool_stats.get("PidTool").calls == 5
+    with pytest.raises(ValueError):
+        mcp.set_tool_trust("PidTool", "root")
@@ -1,5 +1,12 @@
 import asyncio
+import gzip
+import json
+import time
+
+import pytest
+
 from alita_agent.config.settings import AlitaConfig
+from alita_agent.core.episode_store import EpisodeStore
 from alita_agent.core.memory import HierarchicalMemorySystem
 
 
@@ -12,6 +19,7 @@ def test_memory_persistence(tmp_path):
         await memory.store_episode({"query": "test", "result": "ok"})
         stats = await memory.get_memory_stats()
         assert stats["episodic_episodes"] == 1
+        await memory.aclose()
         # Reload and ensure persistence
         new_mem = HierarchicalMemorySystem(config)
         stats2 = await new_mem.get_memory_stats()
@@ -32,3 +40,215 @@ def test_memory_recent_episodes(tmp_path):
         assert [e["query"] for e in recent] == ["q3", "q4", "q5"]
 
     asyncio.run(run())
+
+
+def test_memory_tiers_demote_and_read_through(tmp_path):
+    config = AlitaConfig()
+    config.workspace_dir = str(tmp_path)
+    config.memory.update(hot_episodes=2, max_episodes=3, archive_batch=2)
+    memory = HierarchicalMemorySystem(config)
+
+    async def run():
+        for i in range(10):
+            await memory.store_episode({"query": f"q{i}"})
+            await memory.flush()
+        assert [e["query"] for e in memory.episodic_memory] == ["q8", "q9"]
+        stats = await memory.get_memory_stats()
+        assert stats == {
+            "episodic_episodes": 10,
+            "hot_episodes": 2,
+            "warm_episodes": 4,
+            "cold_episodes": 6,
+            "result_blobs": 0,
+        }
+        recent = await memory.get_recent_episodes(7)
+        assert [e["query"] for e in recent] == [f"q{i}" for i in range(3, 10)]
+        everything = await memory.get_recent_episodes(50)
+        assert [e["query"] for e in everything] == [f"q{i}" for i in range(10)]
+        await memory.aclose()
+
+    asyncio.run(run())
+    segments = sorted((tmp_path / "memory" / "archive").glob("*.jsonl.gz"))
+    assert len(segments) == 3
+    assert json.loads(gzip.decompress(segments[0].read_bytes()).splitlines()[0]) == {
+        "id": 1,
+        "created": pytest.approx(time.time(), abs=60),
+        "episode": {"query": "q0"},
+    }
+    reloaded = HierarchicalMemorySystem(config)
+    assert [e["query"] for e in reloaded.episodic_memory] == ["q8", "q9"]
+    # Startup reads the warm tail and the counters, not the archive.
+    assert reloaded.store.archive._segments is None
+    assert reloaded.store.counts() == {"warm": 4, "cold": 6, "blobs": 0}
+
+
+def test_results_are_shared_blobs_released_on_demotion(tmp_path):
+    store = EpisodeStore(
+        tmp_path / "episodes.sqlite3",
+        tmp_path / "archive",
+        warm_limit=3,
+        archive_batch=2,
+        blob_min_bytes=10,
+    )
+    big = {"rows": list(range(20))}
+    store.append([(0.0, {"query": f"q{i}", "result": big}) for i in range(3)])
+    store.append([(0.0, {"query": "small", "result": 1})])
+    assert store.counts() == {"warm": 4, "cold": 0, "blobs": 1}
+    (refs,) = store._conn.execute("SELECT refs FROM blobs").fetchone()
+    assert refs == 3
+    assert [e["result"] for e in store.tail(4)] == [big, big, big, 1]
+
+    # Demoting q0 and q1 releases two references; q2 still holds the blob.
+    other = {"other": True} | big
+    store.append([(0.0, {"query": "q4", "result": other})])
+    assert store.counts() == {"warm": 3, "cold": 2, "blobs": 2}
+    store.append([(0.0, {"query": f"q{i}"}) for i in range(5, 7)])
+    assert store.counts() == {"warm": 3, "cold": 4, "blobs": 1}
+    episodes = store.tail(7)
+    assert [e.get("result") for e in episodes] == [big, big, big, 1, other, None, None]
+    store.close()
+
+
+def test_unserializable_results_do_not_drop_the_batch(tmp_path):
+    config = AlitaConfig()
+    config.workspace_dir = str(tmp_path)
+    memory = HierarchicalMemorySystem(config)
+    circular = []
+    circular.append(circular)
+
+    async def run():
+        await memory.store_episode({"query": "q0", "result": 1})
+        await memory.store_episode({"query": "q1", "result": {1, 2}})
+        await memory.store_episode({"query": "q2", "result": circular})
+        await memory.store_episode({"query": "q3", "result": 3})
+        await memory.aclose()
+
+    asyncio.run(run())
+    reloaded = HierarchicalMemorySystem(config)
+    assert list(reloaded.episodic_memory) == [
+        {"query": "q0", "result": 1},
+        {"query": "q1", "result": "{1, 2}"},
+        {"query": "q3", "result": 3},
+    ]
+
+
+def test_legacy_memory_file_is_migrated(tmp_path):
+    config = AlitaConfig()
+    config.workspace_dir = str(tmp_path)
+    legacy = config.get_workspace_path("memory") / "episodic.json"
+    legacy.write_text(json.dumps([{"query": "old"}], indent=2))
+    memory = HierarchicalMemorySystem(config)
+    assert list(memory.episodic_memory) == [{"query": "old"}]
+    assert not legacy.exists()
+
+
+def test_unreadable_legacy_memory_file_is_kept(tmp_path):
+    config = AlitaConfig()
+    config.workspace_dir = str(tmp_path)
+    legacy = config.get_workspace_path("memory") / "episodic.json"
+    legacy.write_text('[{"query": "old"}')
+    memory = HierarchicalMemorySystem(config)
+    assert list(memory.episodic_memory) == []
+    assert legacy.read_text() == '[{"query": "old"}'
+
+
+def test_episodes_are_written_behind_in_batches(tmp_path):
+    config = AlitaConfig()
+    config.workspace_dir = str(tmp_path)
+    config.memory.update(flush_batch_size=3, flush_interval=60)
+    memory = HierarchicalMemorySystem(config)
+
+    memory_dir = tmp_path / "memory"
+
+    def on_disk():
+        store = EpisodeStore(memory_dir / "episodes.sqlite3", memory_dir / "archive")
+        try:
+            return [e["query"] for e in store.tail(10)]
+        finally:
+            store.close()
+
+    async def run():
+        await memory.store_episode({"query": "q0"})
+        await memory.store_episode({"query": "q1"})
+        assert on_disk() == []
+        assert memory.episodic_memory[-1]["query"] == "q1"
+        await memory.store_episode({"query": "q2"})
+        for _ in range(100):
+            if on_disk():
+                break
+            await asyncio.sleep(0.01)
+        assert on_disk() == ["q0", "q1", "q2"]
+        await memory.store_episode({"query": "q3"})
+
+    # The loop ends without aclose(): cancelling the flusher hands q3 over.
+    asyncio.run(run())
+    asyncio.run(memory.store_episode({"query": "q4"}))
+    asyncio.run(memory.aclose())
+    assert on_disk() == ["q0", "q1", "q2", "q3", "q4"]
+
+
+def test_find_similar_episodes(tmp_path):
+    config = AlitaConfig()
+    config.workspace_dir = str(tmp_path)
+    memory = HierarchicalMemorySystem(config)
+    memory.store.append(
+        [(time.time() - 1000, {"query": "reverse hello", "tool": "Old", "result": 0})]
+    )
+
+    async def run():
+        await memory.store_episode(
+            {"query": "Reverse  HELLO!", "tool": "A", "result": 1}
+        )
+        await memory.store_episode({"query": "reverse hello world", "tool": "B"})
+        await memory.store_episode({"query": "sort numbers", "tool": "A"})
+
+        exact = await memory.find_similar_episodes("reverse hello")
+        assert [m["episode"]["tool"] for m in exact] == ["A", "Old"]
+        assert exact[0]["similarity"] == 1.0
+        fresh = await memory.find_similar_episodes("reverse hello", max_age=60)
+        assert [m["episode"]["tool"] for m in fresh] == ["A"]
+        near = await memory.find_similar_episodes(
+            "hello reverse", max_age=60, min_similarity=0.5
+        )
+        assert [(m["episode"]["tool"], m["similarity"]) for m in near] == [
+            ("A", 1.0),
+            ("B", pytest.approx(2 / 3)),
+        ]
+        by_tool = await memory.find_similar_episodes(
+            "reverse hello world", tool="A", min_similarity=0.5
+        )
+        assert [m["episode"]["tool"] for m in by_tool] == ["A"]
+        await memory.aclose()
+
+    asyncio.run(run())
+
+
+def test_find_similar_episodes_does_not_wait_for_writes(tmp_path):
+    import threading
+
+    config = AlitaConfig(workspace_dir=str(tmp_path))
+    config.memory["flush_batch_size"] = 1
+    memory = HierarchicalMemorySystem(config)
+    memory.store.append([(time.time(), {"query": "echo", "tool": "Stored"})])
+    unblock = threading.Event()
+    append = memory.store.append
+    memory.store.append = lambda episodes: unblock.wait() and append(episodes)
+
+    async def run():
+        # The first batch is stuck on the writer, the second queued behind it.
+        await memory.store_episode({"query": "Echo!", "tool": "Writing"})
+        await memory.store_episode({"query": "echo", "tool": "Queued"})
+        try:
+            matches = await asyncio.wait_for(
+                memory.find_similar_episodes("echo", limit=5), timeout=5
+            )
+        finally:
+            unblock.set()
+        assert [m["episode"]["tool"] for m in matches] == [
+            "Queued",
+            "Writing",
+            "Stored",
+        ]
+        await memory.aclose()
+
+    asyncio.run(run())
@@ -1,4 +1,5 @@
 import asyncio
+import json
 from alita_agent.config.settings import AlitaConfig
 from alita_agent.utils.security import SandboxExecutor
 
@@ -11,3 +12,647 @@ def test_validate_code_disallows_import(tmp_path):
         assert not await executor.validate_code("import os\nprint('hi')")
 
     asyncio.run(run())
+
+
+def _pool_config(tmp_path, **mcp):
+    config = AlitaConfig(workspace_dir=str(tmp_path))
+    config.security["use_docker"] = False
+    config.mcp.update(mcp)
+    return config
+
+
+PID_TOOL = (
+    "import os\n\ndef execute(params):\n    return {'pid': os.getpid(), **params}\n"
+)
+
+
+def test_worker_pool_reuses_warm_worker(tmp_path):
+    executor = SandboxExecutor(_pool_config(tmp_path, worker_pool_size=1))
+
+    async def run():
+        first = await executor.execute_code(PID_TOOL, {"n": 1})
+        second = await executor.execute_code(PID_TOOL, {"n": 2})
+        assert first.success and second.success
+        assert second.result["n"] == 2
+        assert first.result["pid"] == second.result["pid"]
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.close()
+
+
+def test_worker_pool_recycles_after_max_calls(tmp_path):
+    executor = SandboxExecutor(
+        _pool_config(tmp_path, worker_pool_size=1, worker_max_calls=1)
+    )
+
+    async def run():
+        first = await executor.execute_code(PID_TOOL, {})
+        second = await executor.execute_code(PID_TOOL, {})
+        assert first.result["pid"] != second.result["pid"]
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.close()
+
+
+def test_worker_pool_replaces_crashed_worker(tmp_path):
+    executor = SandboxExecutor(_pool_config(tmp_path, worker_pool_size=1))
+    crash = "import os\n\ndef execute(params):\n    os._exit(3)\n"
+
+    async def run():
+        failed = await executor.execute_code(crash, {})
+        assert not failed.success
+        assert "exited unexpectedly" in failed.error
+        recovered = await executor.execute_code(PID_TOOL, {})
+        assert recovered.success
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.close()
+
+
+def test_worker_pool_supports_stdin_only_tools(tmp_path):
+    executor = SandboxExecutor(_pool_config(tmp_path, worker_pool_size=1))
+    legacy = (
+        "import sys, json\n"
+        "if __name__ == '__main__':\n"
+        "    print(json.dumps({'echo': json.loads(sys.stdin.read())['x']}))\n"
+    )
+
+    async def run():
+        result = await executor.execute_code(legacy, {"x": "hi"})
+        assert result.success
+        assert result.result == {"echo": "hi"}
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.close()
+
+
+def test_worker_pool_runs_unguarded_stdin_tools_once(tmp_path):
+    executor = SandboxExecutor(_pool_config(tmp_path, worker_pool_size=1))
+    script = (
+        "import sys, json\n"
+        "params = json.load(sys.stdin)\n"
+        "print(json.dumps({'echo': params['x']}))\n"
+    )
+
+    async def run():
+        # The second call reuses the worker that served the first.
+        for value in ("a", "b"):
+            result = await executor.execute_code(script, {"x": value})
+            assert result.success, result.error
+            assert result.result == {"echo": value}
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.close()
+
+
+def test_worker_pool_does_not_share_a_worker_between_tools(tmp_path):
+    executor = SandboxExecutor(_pool_config(tmp_path, worker_pool_size=1))
+    patcher = (
+        "import math\n\n"
+        "def execute(params):\n"
+        "    math.sqrt = lambda x: 42\n"
+        "    return {'pid': __import__('os').getpid()}\n"
+    )
+    sqrt = "import math\n\ndef execute(params):\n    return {'root': math.sqrt(16)}\n"
+
+    async def run():
+        assert (await executor.execute_code(patcher, {})).success
+        result = await executor.execute_code(sqrt, {})
+        assert result.success and result.result == {"root": 4.0}
+        # Calls of the same tool still reuse its warm worker.
+        again = await executor.execute_code(patcher, {})
+        assert again.success
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.close()
+
+
+def test_worker_pool_starts_workers_off_the_event_loop(tmp_path):
+    import threading
+
+    executor = SandboxExecutor(_pool_config(tmp_path, worker_pool_size=1))
+    acquire = executor.worker_pool.acquire
+    threads = []
+
+    def recording_acquire(tool):
+        threads.append(threading.current_thread())
+        return acquire(tool)
+
+    executor.worker_pool.acquire = recording_acquire
+    try:
+        assert asyncio.run(executor.execute_code(PID_TOOL, {})).success
+    finally:
+        executor.close()
+    assert threads and threading.main_thread() not in threads
+
+
+def test_worker_pool_times_out_and_kills_worker(tmp_path):
+    executor = SandboxExecutor(
+        _pool_config(tmp_path, worker_pool_size=1, execution_timeout=0.5)
+    )
+    hang = "import time\n\ndef execute(params):\n    time.sleep(30)\n"
+
+    async def run():
+        result = await executor.execute_code(hang, {})
+        assert not result.success
+        assert result.error == "Execution timed out."
+        assert (await executor.execute_code(PID_TOOL, {})).success
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.close()
+
+
+SLEEP_TOOL = (
+    "import json, sys, time\n"
+    "params = json.loads(sys.stdin.read())\n"
+    "time.sleep(params['delay'])\n"
+    "print(json.dumps({'slept': params['delay']}))\n"
+)
+
+
+def test_subprocess_execution_does_not_block_event_loop(tmp_path):
+    executor = SandboxExecutor(
+        _pool_config(tmp_path, worker_pool_size=0, max_concurrent_executions=4)
+    )
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.05)
+                ticks += 1
+
+        tick_task = asyncio.create_task(ticker())
+        results = await asyncio.gather(
+            *(executor.execute_code(SLEEP_TOOL, {"delay": 0.5}) for _ in range(3))
+        )
+        tick_task.cancel()
+        assert all(r.success for r in results)
+        assert ticks >= 5
+
+    asyncio.run(run())
+
+
+def test_concurrency_limit_serializes_executions(tmp_path):
+    executor = SandboxExecutor(
+        _pool_config(tmp_path, worker_pool_size=0, max_concurrent_executions=1)
+    )
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(
+            *(executor.execute_code(SLEEP_TOOL, {"delay": 0.3}) for _ in range(2))
+        )
+        assert loop.time() - start >= 0.6
+
+    asyncio.run(run())
+
+
+def test_cancellation_kills_sandbox_process(tmp_path):
+    import os
+    import time
+
+    executor = SandboxExecutor(_pool_config(tmp_path, worker_pool_size=0))
+    pid_file = tmp_path / "child.pid"
+    code = (
+        "import os, time\n"
+        f"open({str(pid_file)!r}, 'w').write(str(os.getpid()))\n"
+        "time.sleep(30)\n"
+    )
+
+    async def run():
+        task = asyncio.create_task(executor.execute_code(code, {}))
+        while not pid_file.exists() or not pid_file.read_text():
+            await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        else:
+            raise AssertionError("execution was not cancelled")
+
+    asyncio.run(run())
+    pid = int(pid_file.read_text())
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.05)
+    else:
+        raise AssertionError("sandbox process survived cancellation")
+
+
+def test_script_store_reuses_and_evicts_scripts(tmp_path):
+    from alita_agent.utils.script_store import ScriptStore
+
+    store = ScriptStore(tmp_path / "scripts", max_entries=2)
+    with store.materialize("print(1)") as first:
+        mtime = first.stat().st_mtime_ns
+    with store.materialize("print(1)") as again:
+        assert again == first
+        assert again.stat().st_mtime_ns == mtime
+    with store.materialize("print(2)") as second:
+        with store.materialize("print(3)"):
+            # The least recently used script is evicted, pinned ones survive.
+            assert not first.exists()
+            assert second.exists()
+
+
+def test_script_store_rewrites_scripts_deleted_by_another_store(tmp_path):
+    from alita_agent.utils.script_store import ScriptStore
+
+    store = ScriptStore(tmp_path / "scripts")
+    other = ScriptStore(tmp_path / "scripts", max_entries=1)
+    with store.materialize("print(1)") as path:
+        pass
+    for code in ("print(1)", "print(2)"):
+        with other.materialize(code):
+            pass
+    assert not path.exists()
+    with store.materialize("print(1)") as again:
+        assert again.read_text() == "print(1)"
+
+
+def test_containers_cannot_tamper_with_stored_scripts(tmp_path):
+    from alita_agent.utils.script_store import ScriptStore
+
+    executor = SandboxExecutor(_pool_config(tmp_path, worker_pool_size=0))
+    command = executor._docker_run_command("c", tmp_path, ["python"])
+    assert f"{tmp_path}:/app:ro" in command
+
+    with ScriptStore(tmp_path / "scripts").materialize("print(1)") as path:
+        path.write_text("print('tampered')")
+    # A new store adopts files left by earlier runs, but only unmodified ones.
+    with ScriptStore(tmp_path / "scripts").materialize("print(1)") as again:
+        assert again == path
+        assert again.read_text() == "print(1)"
+
+
+def test_parallel_executions_use_distinct_scripts(tmp_path):
+    executor = SandboxExecutor(_pool_config(tmp_path, worker_pool_size=0))
+    tools = [f"import json\nprint(json.dumps({{'tool': {i}}}))\n" for i in range(4)]
+
+    async def run():
+        results = await asyncio.gather(
+            *(executor.execute_code(code, {}) for code in tools)
+        )
+        assert [r.result["tool"] for r in results] == [0, 1, 2, 3]
+
+    asyncio.run(run())
+    assert len(list((tmp_path / "temp_exec").glob("*.py"))) == 4
+
+
+FAKE_DOCKER = '''#!{python}
+"""Minimal stand-in for the docker CLI used by the sandbox tests."""
+import json, os, subprocess, sys, uuid
+
+state = os.environ["FAKE_DOCKER_STATE"]
+args = sys.argv[1:]
+with open(os.path.join(state, "calls.log"), "a") as log:
+    log.write(" ".join(args[:2]) + "\\n")
+if args[0] == "--version":
+    print("Docker version 0.0-fake")
+elif args[0] == "run" and "-d" in args:
+    mount = args[args.index("-v") + 1].split(":")[0]
+    container = uuid.uuid4().hex
+    with open(os.path.join(state, container), "w") as f:
+        json.dump({{"mount": mount}}, f)
+    print(container)
+elif args[0] == "exec":
+    with open(os.path.join(state, args[2])) as f:
+        mount = json.load(f)["mount"]
+    scratch = os.path.join(state, "tmp")
+    os.makedirs(scratch, exist_ok=True)
+    command = [
+        scratch if a == "/tmp" else a.replace("/app/", mount + "/")
+        for a in args[4:]
+    ]
+    sys.exit(subprocess.call([sys.executable, *command]))
+'''
+
+
+def _install_fake_docker(tmp_path, monkeypatch):
+    import os
+    import stat
+    import sys
+
+    bin_dir = tmp_path / "bin"
+    state_dir = tmp_path / "docker_state"
+    bin_dir.mkdir()
+    state_dir.mkdir()
+    docker = bin_dir / "docker"
+    docker.write_text(FAKE_DOCKER.format(python=sys.executable))
+    docker.chmod(docker.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_DOCKER_STATE", str(state_dir))
+    return state_dir / "calls.log"
+
+
+def _docker_config(tmp_path, **security):
+    config = AlitaConfig(workspace_dir=str(tmp_path / "ws"))
+    config.security.update(use_docker=True, **security)
+    return config
+
+
+def test_docker_pool_reuses_containers_and_caches_probe(tmp_path, monkeypatch):
+    calls_log = _install_fake_docker(tmp_path, monkeypatch)
+    leftover = tmp_path / "docker_state" / "tmp" / "leftover"
+    leftover.parent.mkdir()
+    leftover.write_text("from an earlier tool")
+    executor = SandboxExecutor(_docker_config(tmp_path, docker_pool_size=1))
+    code = "import json, sys\nprint(json.dumps(json.loads(sys.stdin.read())))\n"
+
+    async def run():
+        for i in range(3):
+            result = await executor.execute_code(code, {"i": i})
+            assert result.success and result.result == {"i": i}
+        return result
+
+    try:
+        last = asyncio.run(run())
+    finally:
+        executor.close()
+    calls = calls_log.read_text().splitlines()
+    assert calls.count("--version") == 1
+    assert last.user_time is not None and last.max_rss > 0
+    assert calls.count("run -d") == 1
+    assert calls.count("exec -i") == 3
+    # The container's scratch directory is emptied before each run.
+    assert not leftover.exists()
+    assert calls[-1] == "rm -f"
+
+
+def test_docker_pool_recycles_containers(tmp_path, monkeypatch):
+    calls_log = _install_fake_docker(tmp_path, monkeypatch)
+    executor = SandboxExecutor(
+        _docker_config(tmp_path, docker_pool_size=1, docker_max_runs=1)
+    )
+    code = "print('{}')\n"
+
+    async def run():
+        assert (await executor.execute_code(code, {})).success
+        assert (await executor.execute_code(code, {})).success
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.close()
+    calls = calls_log.read_text().splitlines()
+    assert calls.count("run -d") == 2
+
+
+def test_pool_streams_progress_and_partials(tmp_path):
+    executor = SandboxExecutor(_pool_config(tmp_path, worker_pool_size=1))
+    code = (
+        "def execute(params):\n"
+        "    report_progress({'stage': 'start'})\n"
+        "    for i in range(params['n']):\n"
+        "        yield i\n"
+    )
+
+    async def run():
+        records = [r async for r in executor.execute_code_stream(code, {"n": 3})]
+        assert [r.type for r in records] == [
+            "progress",
+            "partial",
+            "partial",
+            "partial",
+            "result",
+        ]
+        assert records[0].data == {"stage": "start"}
+        collected = await executor.execute_code(code, {"n": 3})
+        assert collected.success and collected.result == [0, 1, 2]
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.close()
+
+
+def test_subprocess_stream_delivers_records_before_exit(tmp_path):
+    executor = SandboxExecutor(_pool_config(tmp_path, worker_pool_size=0))
+    code = (
+        "import json, sys, time\n"
+        "frame = {'__frame__': 1}\n"
+        "print(json.dumps({**frame, 'type': 'progress', 'data': 'working'}))\n"
+        "sys.stdout.flush()\n"
+        "time.sleep(1)\n"
+        "print(json.dumps({**frame, 'type': 'result', 'data': {'done': True}}))\n"
+    )
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        stream = executor.execute_code_stream(code, {})
+        first = await stream.__anext__()
+        assert first.type == "progress" and first.data == "working"
+        assert loop.time() - start < 0.9
+        final = [r async for r in stream]
+        assert final[-1].type == "result" and final[-1].data == {"done": True}
+
+    asyncio.run(run())
+
+
+def test_results_with_a_type_key_are_not_taken_for_frames():
+    from alita_agent.utils.tool_stream import StreamDecoder
+
+    for payload in ({"type": "result", "count": 3}, {"type": "error", "code": 404}):
+        decoder = StreamDecoder()
+        assert list(decoder.feed(json.dumps(payload) + "\n")) == []
+        record = decoder.finish()
+        assert record.type == "result" and record.data == payload
+
+
+def test_unframed_multiline_json_output_still_decodes(tmp_path):
+    executor = SandboxExecutor(_pool_config(tmp_path, worker_pool_size=0))
+    code = "import json\nprint(json.dumps({'a': [1, 2]}, indent=2))\n"
+
+    async def run():
+        result = await executor.execute_code(code, {})
+        assert result.success and result.result == {"a": [1, 2]}
+
+    asyncio.run(run())
+
+
+def test_execution_results_report_resource_usage(tmp_path):
+    code = "import json\n\ndef execute(params):\n    return {'x': 1}\n"
+    code += "if __name__ == '__main__':\n    print(json.dumps(execute({})))\n"
+
+    async def run(executor, pooled):
+        result = await executor.execute_code(code, {})
+        assert result.success
+        assert result.wall_time > 0
+        assert result.output_bytes > 0
+        assert result.user_time is not None and result.sys_time is not None
+        # A pooled worker's peak RSS spans every call it has served.
+        if pooled:
+            assert result.max_rss is None
+        else:
+            assert result.max_rss > 0
+
+    for pool_size in (0, 1):
+        executor = SandboxExecutor(_pool_config(tmp_path, worker_pool_size=pool_size))
+        try:
+            asyncio.run(run(executor, pooled=pool_size > 0))
+        finally:
+            executor.close()
+
+
+def test_tool_stats_store_aggregates_per_tool():
+    from alita_agent.utils.tool_stats import ResourceUsage, ToolStatsStore
+
+    store = ToolStatsStore()
+    store.record("A", ResourceUsage(wall_time=1.0, user_time=2.0, sys_time=1.0), True)
+    store.record("A", ResourceUsage(wall_time=1.0, max_rss=500), False)
+    store.record("B", ResourceUsage(wall_time=0.5, user_time=0.1, sys_time=0.0), True)
+
+    stats = store.get("A")
+    assert stats.calls == 2 and stats.failures == 1
+    assert stats.wall_time == 2.0 and stats.cpu_time == 3.0
+    assert stats.peak_rss == 500
+    assert [s.name for s in store.top("cpu_time")] == ["A", "B"]
+
+
+def test_validate_code_caches_verdicts(tmp_path, monkeypatch):
+    import ast
+
+    executor = SandboxExecutor(AlitaConfig(workspace_dir=str(tmp_path)))
+    code = "import json\n\ndef execute(params):\n    return params\n"
+
+    async def run():
+        assert await executor.validate_code(code)
+        monkeypatch.setattr(ast, "parse", lambda *a, **k: 1 / 0)
+        assert await executor.validate_code(code)
+
+    asyncio.run(run())
+
+
+BATCH_TOOL = (
+    "import os\n\n"
+    "def execute(params):\n"
+    "    if params.get('crash'):\n"
+    "        os._exit(1)\n"
+    "    return {'pid': os.getpid(), 'double': 2 * params['n']}\n"
+)
+
+
+def test_batch_runs_inputs_in_one_process_and_isolates_errors(tmp_path):
+    params = [{"n": 1}, {"n": "x"}, {}, {"n": 3}, {"crash": True}, {"n": 5}]
+
+    async def run(executor):
+        results = await executor.execute_code_batch(BATCH_TOOL, params)
+        assert [r.success for r in results] == [True, True, False, True, False, True]
+        assert [r.result["double"] for r in results if r.success] == [2, "xx", 6, 10]
+        assert "KeyError" in results[2].error
+        pids = [r.result["pid"] for r in results if r.success]
+        # One process until the crash, then a fresh one for the rest.
+        assert pids[0] == pids[1] == pids[2] != pids[3]
+        assert all(r.wall_time is not None for r in results)
+
+    for pool_size in (0, 1):
+        executor = SandboxExecutor(_pool_config(tmp_path, worker_pool_size=pool_size))
+        try:
+            asyncio.run(run(executor))
+        finally:
+            executor.close()
+
+
+def test_batch_times_out_single_item(tmp_path):
+    config = _pool_config(tmp_path, worker_pool_size=0)
+    config.mcp["execution_timeout"] = 1
+    executor = SandboxExecutor(config)
+    code = (
+        "import time\n\n"
+        "def execute(params):\n"
+        "    time.sleep(params['s'])\n"
+        "    return params['s']\n"
+    )
+
+    async def run():
+        results = await executor.execute_code_batch(
+            code, [{"s": 0}, {"s": 5}, {"s": 0}]
+        )
+        assert [r.success for r in results] == [True, False, True]
+        assert results[1].error == "Execution timed out."
+
+    asyncio.run(run())
+
+
+def test_batch_reports_syntax_errors_for_every_item(tmp_path):
+    executor = SandboxExecutor(_pool_config(tmp_path, worker_pool_size=0))
+
+    async def run():
+        results = await executor.execute_code_batch("def execute(:\n", [{}, {}])
+        assert all("SyntaxError" in r.error for r in results)
+
+    asyncio.run(run())
+
+
+def test_docker_batch_uses_one_exec(tmp_path, monkeypatch):
+    calls_log = _install_fake_docker(tmp_path, monkeypatch)
+    executor = SandboxExecutor(_docker_config(tmp_path, docker_pool_size=1))
+
+    async def run():
+        params = [{"n": i} for i in range(5)]
+        results = await executor.execute_code_batch(BATCH_TOOL, params)
+        assert [r.result["double"] for r in results] == [0, 2, 4, 6, 8]
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.close()
+    calls = calls_log.read_text().splitlines()
+    assert calls.count("exec -i") == 1
+
+
+def test_worker_ignores_bytecode_of_other_source(tmp_path):
+    from alita_agent.utils.bytecode import compile_tool
+
+    stale = tmp_path / "EditedTool.pyc"
+    assert compile_tool(b"def execute(params):\n    return 1\n", stale)
+    edited = (
+        "def execute(params):\n"
+        "    if params:\n"
+        "        raise ValueError('boom')\n"
+        "    return 2\n"
+    )
+    executor = SandboxExecutor(_pool_config(tmp_path, worker_pool_size=1))
+
+    async def run():
+        result = await executor.execute_code(edited, {}, bytecode_path=stale)
+        assert result.success and result.result == 2
+        failed = await executor.execute_code(edited, {"x": 1}, bytecode_path=stale)
+        assert not failed.success
+        # Tracebacks name the tool's source file.
+        assert str(tmp_path / "EditedTool.py") in failed.error
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.close()
+
+    # One-shot interpreters don't check the hash themselves when given a .pyc.
+    assert compile_tool(b"print(1)\n", stale)
+    one_shot = SandboxExecutor(_pool_config(tmp_path, worker_pool_size=0))
+    result = asyncio.run(one_shot.execute_code("print(2)\n", {}, bytecode_path=stale))
+    assert result.success and result.result == 2
@@ -0,0 +1,38 @@
+from alita_agent.core.tool_dedup import MinHashLSH
+from alita_agent.core.tool_registry import ToolRegistry
+
+
+def test_minhash_estimates_jaccard_similarity():
+    lsh = MinHashLSH(threshold=0.5)
+    lsh.add("Reverse", "A tool that can: reverse a string")
+    lsh.add("Sort", "A tool that can: sort a list of numbers")
+    assert lsh.query("A tool that can: reverse the string")[0] == ("Reverse", 1.0)
+    assert lsh.query("download an image") == []
+    assert lsh.query("reverse a string", exclude="Reverse") == []
+    lsh.remove("Reverse")
+    assert len(lsh) == 1 and lsh.query("reverse a string") == []
+
+
+def test_registry_flags_near_duplicates_and_reports_clusters(tmp_path):
+    registry = ToolRegistry(tmp_path, refresh_interval=None)
+    assert (
+        registry.register_tool("Reverse", "A tool that can: reverse a string") is None
+    )
+    registry.register_tool("Sort", "A tool that can: sort a list of numbers")
+    assert (
+        registry.register_tool("ReverseAgain", "A tool that can: reverse the string")
+        == "Reverse"
+    )
+    registry.register_tool("ReverseThird", "reverse string")
+    assert registry.duplicates == {
+        "ReverseAgain": "Reverse",
+        "ReverseThird": "Reverse",
+    }
+    assert registry.find_duplicate("Reverse a string!") == "Reverse"
+    assert registry.dedup_report() == [
+        {
+            "canonical": "Reverse",
+            "duplicates": ["ReverseAgain", "ReverseThird"],
+            "similarity": 1.0,
+        }
+    ]
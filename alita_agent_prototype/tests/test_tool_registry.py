@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+from alita_agent.core.tool_registry import ToolRegistry
+from alita_agent.core.tool_store import FileToolStore, SQLiteToolStore
+
+
+def _stores(tmp_path, backend):
+    if backend == "files":
+        return FileToolStore(tmp_path), FileToolStore(tmp_path)
+    db_path = tmp_path / "tools.sqlite3"
+    return SQLiteToolStore(db_path), SQLiteToolStore(db_path)
+
+
+@pytest.mark.parametrize("backend", ["files", "sqlite"])
+def test_store_reports_only_changed_tools(tmp_path, backend):
+    store, _ = _stores(tmp_path, backend)
+    store.save("A", "a = 1\n", {"description": "first"})
+    changes, cursor = store.changes_since(None)
+    assert changes == {"A": "first"}
+
+    store.save("B", "b = 1\n", {"description": "second"})
+    changes, cursor = store.changes_since(cursor)
+    assert changes == {"B": "second"}
+    if backend == "files":
+        # Pretend the directory has been quiet since the last scan.
+        os.utime(tmp_path, ns=(1, 1))
+        cursor = store.changes_since(cursor)[1]
+        assert cursor[0] == 1
+    assert store.changes_since(cursor)[0] == {}
+
+
+@pytest.mark.parametrize("backend", ["files", "sqlite"])
+def test_registry_picks_up_tools_from_other_processes(tmp_path, backend):
+    ours, theirs = _stores(tmp_path, backend)
+    registry = ToolRegistry(tmp_path, store=ours, refresh_interval=None)
+    generation = registry.generation
+
+    theirs.save("RemoteTool", "x = 1\n", {"description": "reverse a string"})
+    assert registry.find_tool_by_description("reverse a string") is None
+    assert registry.tool_exists("RemoteTool")
+    assert registry.generation == generation + 1
+
+    theirs.save("PolledTool", "x = 2\n", {"description": "sort a list of numbers"})
+    registry.refresh_interval = 0
+    assert registry.find_tool_by_description("sort a list of numbers") == "PolledTool"
+    assert registry.refresh() == 0
+
+
+def test_top_k_ranks_indexed_candidates(tmp_path):
+    registry = ToolRegistry(tmp_path, refresh_interval=None)
+    for i in range(200):
+        registry.register_tool(f"Filler{i}", f"A tool that can: compute checksum {i}")
+    registry.register_tool("Reverse", "A tool that can: reverse a string")
+    registry.register_tool("Sort", "A tool that can: sort a list of numbers")
+
+    ranked = registry.top_k("A tool that can: reverse the string", k=3)
+    assert ranked[0][0] == "Reverse"
+    assert ranked[0][1] > 0.6
+    assert [score for _, score in ranked] == sorted(
+        (score for _, score in ranked), reverse=True
+    )
+    assert registry.find_tool_by_description("A tool that can: sort numbers") == "Sort"
+    assert registry.find_tool_by_description("A tool that can: fly a kite") is None
+
+    registry.register_tool("Reverse", "A tool that can: translate text")
+    assert "Reverse" not in [name for name, _ in registry.top_k("reverse string")]
+
+
+def test_lookup_cache_is_invalidated_by_registry_changes(tmp_path):
+    registry = ToolRegistry(tmp_path, refresh_interval=None, lookup_cache_size=2)
+    registry.register_tool("Reverse", "A tool that can: reverse a string")
+
+    name, score = registry.match("A tool that can: reverse a string")
+    assert (name, score) == ("Reverse", 1.0)
+    assert (
+        registry.find_tool_by_description(" A tool  that can: reverse a string")
+        == "Reverse"
+    )
+    assert (registry.lookup_hits, registry.lookup_misses) == (1, 1)
+    assert registry.find_tool_by_description("A tool that can: sort numbers") is None
+
+    registry.register_tool("Sort", "A tool that can: sort numbers")
+    assert registry.find_tool_by_description("A tool that can: sort numbers") == "Sort"
+    assert (registry.lookup_hits, registry.lookup_misses) == (1, 3)
+    assert registry.lookup_hit_rate == 0.25
+    registry.match("reverse")
+    assert len(registry._lookups) == 2
+
+
+def test_lookup_cache_answers_do_not_depend_on_lookup_order(tmp_path):
+    registry = ToolRegistry(tmp_path, refresh_interval=None)
+    registry.register_tool("EchoTool", "echo this text back")
+
+    assert registry.match("ECHO THIS TEXT BACK")[0] is None
+    assert registry.match("echo this text back") == ("EchoTool", 1.0)
@@ -0,0 +1,123 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from alita_agent.config.settings import AlitaConfig
+from alita_agent.core.tool_registry import ToolRegistry
+from alita_agent.core.tool_store import (
+    FileToolStore,
+    SQLiteToolStore,
+    ToolStore,
+    open_tool_store,
+)
+from alita_agent.utils.tool_stats import ResourceUsage
+
+
+def test_sqlite_store_upserts_and_tracks_stats(tmp_path):
+    store = SQLiteToolStore(tmp_path / "tools.sqlite3")
+    try:
+        assert store.save("Echo", "v1", {"description": "echo"}) == 1
+        assert store.save("Echo", "v2", {"description": "echo it"}) == 2
+        store.record_execution(
+            "Echo", ResourceUsage(wall_time=1.0, user_time=0.5), True
+        )
+        store.record_execution("Echo", None, False)
+
+        tool = store.get_tool("Echo")
+        assert tool.code == "v2" and tool.version == 2
+        assert tool.metadata == {"description": "echo it", "name": "Echo"}
+        assert (tool.calls, tool.failures, tool.wall_time, tool.cpu_time) == (
+            2,
+            1,
+            1.0,
+            0.5,
+        )
+        assert store.descriptions() == {"Echo": "echo it"}
+        assert store.get_tool("Missing") is None and store.get_metadata("Missing") == {}
+    finally:
+        store.close()
+
+    conn = sqlite3.connect(tmp_path / "tools.sqlite3")
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+
+def test_sqlite_store_is_shared_between_connections(tmp_path):
+    first = SQLiteToolStore(tmp_path / "tools.sqlite3")
+    second = SQLiteToolStore(tmp_path / "tools.sqlite3")
+    try:
+        first.save("Shared", "a", {})
+        assert second.save("Shared", "b", {}) == 2
+        assert first.get_code("Shared") == "b"
+    finally:
+        first.close()
+        second.close()
+
+
+def test_sqlite_store_imports_existing_file_tools_once(tmp_path):
+    FileToolStore(tmp_path).save(
+        "Old", "def execute(p):\n    return 1\n", {"description": "old"}
+    )
+    store = SQLiteToolStore(tmp_path / "tools.sqlite3", import_dir=tmp_path)
+    store.close()
+    FileToolStore(tmp_path).save("Newer", "x = 1\n", {"description": "new file"})
+
+    store = SQLiteToolStore(tmp_path / "tools.sqlite3", import_dir=tmp_path)
+    try:
+        assert store.descriptions() == {"Old": "old"}
+        assert ToolRegistry(tmp_path, store=store).tools == {"Old": "old"}
+    finally:
+        store.close()
+
+
+def test_sqlite_store_records_executions_without_waiting(tmp_path):
+    store = SQLiteToolStore(tmp_path / "tools.sqlite3")
+    try:
+        store.save("Echo", "v1", {"description": "echo"})
+        # Recording never waits for the database, even while it is busy.
+        with store._lock:
+            for success in (True, True, False):
+                store.record_execution("Echo", ResourceUsage(wall_time=0.5), success)
+        tool = store.get_tool("Echo")
+        assert (tool.calls, tool.failures, tool.wall_time) == (3, 1, 1.5)
+    finally:
+        store.close()
+
+
+def test_mcp_system_with_sqlite_tool_store(tmp_path):
+    from alita_agent.core.mcp_system import MCPSystem
+    from alita_agent.core.web_agent import WebAgent
+
+    config = AlitaConfig(workspace_dir=str(tmp_path))
+    config.security["use_docker"] = False
+    config.mcp["tool_store"] = "sqlite"
+    mcp = MCPSystem(config, WebAgent(config))
+    mcp._save_tool_to_disk(
+        "DbTool", "def execute(p):\n    return p['x'] * 3\n", "triple"
+    )
+
+    async def run():
+        assert await mcp.tool_exists("DbTool")
+        assert (await mcp.execute_tool("DbTool", {"x": 2})).result == 6
+
+    try:
+        asyncio.run(run())
+    finally:
+        mcp.close()
+    assert not list(mcp.tools_dir.glob("*.py"))
+
+    store = open_tool_store(config)
+    try:
+        assert store.get_tool("DbTool").calls == 1
+    finally:
+        store.close()
+
+
+def test_incomplete_backends_fail_when_created():
+    class CodeOnlyStore(ToolStore):
+        def get_tool(self, name):
+            return None
+
+    with pytest.raises(TypeError):
+        CodeOnlyStore()
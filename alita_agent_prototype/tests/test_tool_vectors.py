@@ -0,0 +1,62 @@
+import pytest
+
+from alita_agent.core.tool_registry import ToolRegistry
+
+np = pytest.importorskip("numpy")
+
+from alita_agent.core.tool_vectors import VectorIndex  # noqa: E402
+
+
+def test_search_ranks_by_cosine_and_replaces_rows():
+    index = VectorIndex(dim=128)
+    index.add_many(
+        [
+            ("Reverse", "A tool that can: reverse a string"),
+            ("Sort", "A tool that can: sort a list of numbers"),
+            ("Image", "A tool that can: download an image"),
+        ]
+    )
+    ranked = index.search("A tool that can: reversing strings", k=2)
+    assert ranked[0][0] == "Reverse"
+    assert ranked[0][1] > ranked[1][1]
+
+    batch = index.search_batch(["sort numbers", "download images"], k=1)
+    assert [hits[0][0] for hits in batch] == ["Sort", "Image"]
+
+    assert index.add_many([("Sort", "A tool that can: sort a list of numbers")]) == 0
+    index.add("Reverse", "A tool that can: translate text")
+    assert len(index) == 3
+    assert index.search("reverse a string", k=1)[0][0] != "Reverse"
+
+
+def test_saved_index_is_memory_mapped_and_appendable(tmp_path):
+    path = tmp_path / "tool_vectors.npy"
+    index = VectorIndex(dim=64, path=path)
+    for i in range(100):
+        index.add(f"Tool{i}", f"compute checksum {i}")
+    index.save()
+
+    reloaded = VectorIndex(dim=64, path=path)
+    assert isinstance(reloaded._matrix, np.memmap)
+    assert reloaded.names == index.names
+    assert reloaded.search("compute checksum 42", k=1)[0][0] == "Tool42"
+    assert reloaded.add_many([("Tool7", "compute checksum 7")]) == 0
+
+    reloaded.add("Parser", "parse csv files")
+    assert reloaded.search("parse a csv file", k=1)[0][0] == "Parser"
+    assert VectorIndex(dim=32, path=path).names == []
+
+
+def test_registry_falls_back_to_semantic_match(tmp_path):
+    registry = ToolRegistry(
+        tmp_path,
+        refresh_interval=None,
+        vectors=VectorIndex(path=tmp_path / "tool_vectors.npy"),
+    )
+    registry.register_tool("CsvTool", "A tool that can: parse csv files quickly")
+    query = "quickly parsing CSV files"
+    assert registry.top_k(query, 1)[0][1] <= 0.6
+    assert registry.similar_tools(query, 1)[0][0] == "CsvTool"
+    assert registry.find_tool_by_description(query) == "CsvTool"
+    registry.close()
+    assert (tmp_path / "tool_vectors.npy").exists()